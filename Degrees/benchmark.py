@@ -0,0 +1,262 @@
+import argparse
+import csv
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+import degrees
+from graph import Graph
+from util import Node, QueueFrontier, IndexedQueueFrontier
+
+try:
+    import resource
+except ImportError:
+    # Peak resident memory is only reported where it is available
+    resource = None
+
+# Sections of the benchmark, run in this order by default
+SECTIONS = ["load", "frontier", "queries"]
+
+# Number of states replayed through each frontier
+FRONTIER_SIZES = [1000, 2000, 4000, 8000, 16000]
+
+# Path queries timed per engine
+QUERIES = 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Degrees")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--sections", default=",".join(SECTIONS),
+                        help="comma separated sections to run "
+                             f"(default: {','.join(SECTIONS)})")
+    parser.add_argument("--engines", default=",".join(degrees.ENGINES),
+                        help="comma separated engines for the query section")
+    parser.add_argument("--queries", type=int, default=QUERIES,
+                        help="path queries per engine")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {"directory": args.directory}
+    for section in args.sections.split(","):
+        if section not in SECTIONS:
+            sys.exit(f"Unknown section '{section}'.")
+        if section == "load":
+            results["load"] = benchmark_load(args.directory)
+        elif section == "frontier":
+            results["frontier"] = benchmark_frontiers(args.directory)
+        else:
+            results["queries"] = benchmark_queries(
+                args.directory, args.engines.split(","), args.queries, args.seed)
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def benchmark_load(directory):
+    """
+    Print and return load time and memory for each data layout.
+    """
+    # Write the snapshot up front so only mapping it is measured
+    load_snapshot(directory)
+
+    results = {}
+    print("Layout   Load time   Memory")
+    loaders = [("dict", load_dicts), ("graph", load_graph),
+               ("snapshot", load_snapshot)]
+    for name, loader in loaders:
+        seconds, size = measure_load(loader, directory)
+        print(f"{name:<8} {seconds:8.2f}s   {size / 2 ** 20:8.1f} MiB")
+        results[name] = {"seconds": seconds, "bytes": size}
+    return results
+
+
+def benchmark_frontiers(directory):
+    """
+    Print and return the time to replay growing numbers of states
+    through the list and indexed frontiers.
+    """
+    graph = load_graph(directory)
+    order = bfs_order(graph, max(FRONTIER_SIZES))
+    results = {}
+    print("States   list frontier   indexed frontier")
+    for size in FRONTIER_SIZES:
+        if size > len(order):
+            break
+        old = replay_frontier(QueueFrontier(), list(), order[:size])
+        new = replay_frontier(IndexedQueueFrontier(), set(), order[:size])
+        print(f"{size:<8} {old:12.3f}s   {new:14.3f}s")
+        results[size] = {"list": old, "indexed": new}
+    return results
+
+
+def benchmark_queries(directory, engines, count, seed):
+    """
+    Print and return throughput and latency percentiles of `count`
+    shortest_path queries per engine, between random pairs of credited
+    people chosen with `seed`.
+    """
+    degrees.load_data(directory)
+    graph = degrees.graph
+    credited = [person for person in range(len(graph.person_ids))
+                if graph.person_offsets[person + 1] > graph.person_offsets[person]]
+    generator = random.Random(seed)
+    pairs = [(graph.person_ids[generator.choice(credited)],
+              graph.person_ids[generator.choice(credited)])
+             for _ in range(count)]
+
+    results = {}
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["peak_rss_kib"] = peak
+        print(f"Memory: {peak / 1024:.1f} MiB peak resident")
+    print("Engine          Queries/s      p50      p90      p99      max")
+    for engine in engines:
+        if engine == "landmarks" and graph.landmarks is None:
+            print(f"{engine:<15} skipped, no landmark index")
+            continue
+        latencies = []
+        for source, target in pairs:
+            start = time.perf_counter()
+            degrees.shortest_path(source, target, engine)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        throughput = len(latencies) / sum(latencies)
+        p50, p90, p99 = (percentile(latencies, p) for p in (50, 90, 99))
+        print(f"{engine:<15} {throughput:9.1f} "
+              f"{p50 * 1000:7.2f}ms {p90 * 1000:7.2f}ms {p99 * 1000:7.2f}ms "
+              f"{latencies[-1] * 1000:7.2f}ms")
+        results[engine] = {"throughput": throughput, "p50": p50, "p90": p90,
+                           "p99": p99, "max": latencies[-1]}
+    return results
+
+
+def percentile(values, p):
+    """
+    Return the `p`th percentile of sorted `values` (nearest rank).
+    """
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+
+def measure_load(loader, directory):
+    """
+    Return the wall time taken by `loader(directory)` and the
+    memory held by the data it returns.
+    """
+    # Time without tracing, since tracemalloc slows allocation down
+    start = time.perf_counter()
+    data = loader(directory)
+    seconds = time.perf_counter() - start
+    del data
+
+    tracemalloc.start()
+    data = loader(directory)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, size
+
+
+def replay_frontier(frontier, explored, states):
+    """
+    Return the time taken to push `states` through `frontier` and
+    `explored` the way breadth_first_search does.
+    """
+    add = explored.append if isinstance(explored, list) else explored.add
+    start = time.perf_counter()
+    for state in states:
+        if not frontier.contains_state(state) and state not in explored:
+            frontier.add(Node(state=state, parent=None, action=None))
+    while not frontier.empty():
+        node = frontier.remove()
+        add(node.state)
+        # Every expansion checks its neighbours against both structures
+        frontier.contains_state(node.state)
+        node.state in explored
+    return time.perf_counter() - start
+
+
+def bfs_order(graph, limit):
+    """
+    Return up to `limit` person indices in breadth-first order from
+    the person with the most movies.
+    """
+    source = max(range(len(graph.person_ids)),
+                 key=lambda person: len(graph.movies_of(person)))
+    order = [source]
+    seen = {source}
+    for person in order:
+        for _, star in graph.neighbors(person):
+            if star not in seen:
+                seen.add(star)
+                order.append(star)
+                if len(order) == limit:
+                    return order
+    return order
+
+
+def load_graph(directory):
+    """
+    Load `directory` into the compact integer-indexed graph.
+    """
+    graph = Graph()
+    graph.load(directory, cache=False)
+    return graph
+
+
+def load_snapshot(directory):
+    """
+    Load `directory` through its binary snapshot, writing it first
+    if needed.
+    """
+    graph = Graph()
+    graph.load(directory)
+    return graph
+
+
+def load_dicts(directory):
+    """
+    Load `directory` into the original layout of nested dicts
+    holding sets of string ids.
+    """
+    names = {}
+    people = {}
+    movies = {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set()
+            }
+
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return names, people, movies
+
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,106 @@
-import csv
+import argparse
+import re
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
-
-# Maps names to a set of corresponding person_ids
-# Eg: 'kevin bacon': {'102'}
-names = {}
-
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-# Eg: '102': {'name': 'Kevin Bacon', 'birth': '1958', 'movies': {'112384', '104257'}}
-people = {}
-
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-# Eg: '112384': {'title': 'Apollo 13', 'year': '1995', 'stars': {'200', '158', '102', '641'}}
-movies = {}
- 
-
-def load_data(directory):
-    """
-    Load data from CSV files into memory.
-    """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+from graph import Graph
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+from search import (SearchStats, bidirectional_search, bipartite_search,
+                    breadth_first_search, breadth_first_tree, landmark_search,
+                    tree_path)
+
+# People, movies and the star relation between them, indexed by
+# dense integer ids (see graph.py)
+# Eg: graph.name_of('102') == 'Kevin Bacon'
+graph = Graph()
+
+# Search engines selectable for shortest_path
+ENGINES = {
+    "bfs": breadth_first_search,
+    "bidirectional": bidirectional_search,
+    "bipartite": bipartite_search,
+    "landmarks": landmark_search
+}
+
+# Non-interactive ways to choose between people sharing a name, as sort
+# keys over person indices where the smallest key wins
+# People without a known birth year are chosen last by birth
+POLICIES = {
+    "most-credited": lambda person: -len(graph.movies_of(person)),
+    "earliest-born": lambda person: (not graph.person_births[person],
+                                     graph.person_births[person]),
+    "latest-born": lambda person: (not graph.person_births[person],
+                                   -int(graph.person_births[person] or 0))
+}
+
+# Prefix and trigram index over names, built or mapped by load_data
+# (see nameindex.py)
+name_index = None
+
+
+def load_data(directory, cache=True):
+    """
+    Load data from CSV files into memory, going through the binary
+    snapshot in `directory` if `cache` is set, along with the landmark
+    index if one has been built for `directory`, and the name index,
+    which is saved next to the snapshot the first time it is built.
+    """
+    global name_index
+    graph.load(directory, cache)
+    graph.landmarks = LandmarkIndex.load(directory)
+    name_index = NameIndex.load(directory, graph) if cache else None
+    if name_index is None:
+        name_index = NameIndex.build(graph)
+        if cache:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
+                name_index.save(directory)
+            except OSError:
+                # A read-only dataset is still usable, just not cached
                 pass
 
 
+def ensure_loaded(directory):
+    """
+    Load data unless it is already in memory, as it is in worker
+    processes forked from a process that loaded it.
+    """
+    if not graph.person_ids:
+        load_data(directory)
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Degrees of separation")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--engine", choices=ENGINES,
+                        help="search used to find the shortest path "
+                             "(default: landmarks if indexed, otherwise bfs)")
+    parser.add_argument("--resolve", choices=POLICIES,
+                        help="choose between people sharing a name "
+                             "without asking")
+    parser.add_argument("--stats", action="store_true",
+                        help="print search counters and timing")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse the CSV files and skip the binary snapshot")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, cache=not args.no_cache)
     print("Data loaded.")
-    # print(movies)
-    # print(people)
-    source = person_id_for_name(input("Name: "))
+    if args.engine == "landmarks" and graph.landmarks is None:
+        sys.exit("No landmark index, run landmarks.py")
+    name = input("Name: ")
+    source = person_id_for_name(name, args.resolve)
     if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+        sys.exit(not_found_message(name))
+    name = input("Name: ")
+    target = person_id_for_name(name, args.resolve)
     if target is None:
-        sys.exit("Person not found.")
+        sys.exit(not_found_message(name))
 
-    path = shortest_path(source, target)
+    stats = SearchStats() if args.stats else None
+    path = shortest_path(source, target, args.engine, stats)
 
     if path is None:
         print("Not connected.")
@@ -82,79 +109,129 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.name_of(path[i][1])
+            person2 = graph.name_of(path[i + 1][1])
+            movie = graph.title_of(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
+    if stats is not None:
+        print(f"Expanded {stats.people} people and {stats.movies} movies, "
+              f"scanned {stats.stars} cast entries, "
+              f"allocated {stats.tuples} neighbour tuples "
+              f"in {stats.seconds * 1000:.1f}ms.")
+
 
-def shortest_path(source, target):
+def shortest_path(source, target, engine=None, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `engine` names the search in ENGINES used to find the path. By
+    default the landmark index is used if it was loaded. If `stats` is
+    a SearchStats, it is filled in with counters and timing.
+
     If no possible path, returns None.
     """
-    # States are people, actions are movies
-
-    # keep track of explored states
-    explored = []
-
-    shortest_path = []
-
-    start = Node(state = source, parent = None, action = None)
-    frontier = QueueFrontier()
-    frontier.add(start)
-    while True:
-        # Remove a node from the frontier 
-        if frontier.empty():
-            break
-        node = frontier.remove()
-        explored.append(node.state)
-
-        if node.state == target:
-            while node.parent is not None:
-                shortest_path.append((node.action,node.state))
-                node = node.parent
-            shortest_path.reverse()
-            return shortest_path
-
-        for action,state in neighbours(node.state):
-            # Check if the the node is already visited or already in frontier(stack/queue)
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node,action=action)
-                if child.state == target:
-                    while child.parent is not None:
-                        shortest_path.append((child.action,child.state))
-                        child = child.parent
-                    shortest_path.reverse()
-                    return shortest_path
-                frontier.add(child)        
+    if engine is None:
+        engine = "landmarks" if graph.landmarks is not None else "bfs"
+    # States are person indices, actions are movie indices
+    start = time.perf_counter()
+    path = ENGINES[engine](graph, graph.person_index[source],
+                           graph.person_index[target], stats)
+    if stats is not None:
+        stats.seconds += time.perf_counter() - start
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def shortest_paths(source, targets):
+    """
+    Returns a dictionary mapping each of `targets` to the shortest list
+    of (movie_id, person_id) pairs that connect the source to it, or to
+    None if there is no possible path.
+
+    All targets are answered from a single search from the source.
+    """
+    indices = [graph.person_index[target] for target in targets]
+    tree = breadth_first_tree(graph, graph.person_index[source], indices)
+    paths = {}
+    for target, index in zip(targets, indices):
+        path = tree_path(tree, index)
+        paths[target] = None if path is None else [
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path
+        ]
+    return paths
+
+
+def separation_histogram(source):
+    """
+    Returns a dictionary mapping each degree of separation to the
+    number of other people that far from the source. The source
+    itself and people who are not connected to it are left out.
+    """
+    depth, _, _ = breadth_first_tree(graph, graph.person_index[source])
+    histogram = {}
+    for degrees in depth:
+        if degrees > 0:
+            histogram[degrees] = histogram.get(degrees, 0) + 1
+    return histogram
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    the source and the target from the landmark index, without
+    searching. Either bound is None if the index cannot give one, and
+    both are None if the index shows the two are not connected.
+    """
+    if graph.landmarks is None:
+        return None, None
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    lower = graph.landmarks.lower_bound(source, target)
+    if lower is None:
+        return None, None
+    return lower, graph.landmarks.upper_bound(source, target)
+
 
 def neighbours(person_id):
     '''
     Returns the neighbours of a person
     '''
     neighbour_list = []
-    for action in people[person_id]['movies']:
-        for star in movies[action]['stars']:
-                neighbour_list.append((action,star))
+    for action, star in graph.neighbors(graph.person_index[person_id]):
+        neighbour_list.append((graph.movie_ids[action], graph.person_ids[star]))
     return neighbour_list
 
-def person_id_for_name(name):
+def person_id_for_name(name, policy=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    Ambiguities are resolved by asking, unless `policy` names one of
+    POLICIES to choose by instead. With a policy, a name matching nobody
+    exactly resolves to the best prefix or fuzzy match of the name index.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
+    if not person_ids and policy is not None:
+        person_ids = [graph.person_ids[person]
+                      for person in name_index.matches(name)]
     if len(person_ids) == 0:
         return None
+    elif len(person_ids) > 1 and policy is not None:
+        return graph.person_ids[min(
+            (graph.person_index[person_id] for person_id in person_ids),
+            key=POLICIES[policy]
+        )]
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            person = graph.person_index[person_id]
+            name = graph.person_names[person]
+            birth = graph.person_births[person]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -167,16 +244,51 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_ids_for_name(name):
+    """
+    Returns every IMDB id whose person has the given name.
+
+    A birth year in brackets after the name, as in "Kevin Bacon (1958)",
+    keeps only the people born that year.
+    """
+    people = graph.names.get(name.lower(), [])
+    match = re.fullmatch(r"(.*?)\s*\((\d{4})\)", name.strip())
+    if not people and match:
+        people = [person for person in graph.names.get(match[1].lower(), [])
+                  if graph.person_births[person] == match[2]]
+    return [graph.person_ids[person] for person in people]
+
+
+def suggest_names(name, limit=5):
+    """
+    Returns up to `limit` IMDB ids of people whose names best match
+    `name`, by exact, prefix and then fuzzy match.
+    """
+    return [graph.person_ids[person] for person in name_index.search(name, limit)]
+
+
+def not_found_message(name):
+    """
+    Returns the message for a name matching nobody, with suggestions.
+    """
+    suggestions = []
+    for person_id in suggest_names(name):
+        person = graph.person_index[person_id]
+        birth = graph.person_births[person] or "?"
+        suggestions.append(f"{graph.person_names[person]} ({birth})")
+    if not suggestions:
+        return "Person not found."
+    return f"Person not found. Did you mean: {', '.join(suggestions)}?"
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index[person_id]):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
@@ -0,0 +1,120 @@
+import argparse
+import csv
+import os
+import random
+from array import array
+
+# Name parts combined into synthetic people, so that some names repeat
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+    "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+    "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Daniel",
+    "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Margaret",
+    "Donald", "Sandra", "Steven", "Ashley", "Paul", "Kimberly", "Andrew",
+    "Emily", "Joshua", "Donna", "Kenneth", "Michelle", "Kevin", "Carol",
+    "Brian", "Amanda", "George", "Dorothy", "Timothy", "Melissa", "Ronald",
+    "Deborah", "Edward", "Stephanie", "Jason", "Rebecca", "Jeffrey", "Sharon"
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
+    "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark",
+    "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen", "King",
+    "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green",
+    "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
+    "Carter", "Roberts", "Bacon", "Hanks", "Cruise", "Watson", "Hoffman"
+]
+TITLE_WORDS = [
+    "Night", "Return", "Last", "City", "Love", "Dark", "Secret", "River",
+    "Star", "Time", "King", "Road", "Summer", "Ghost", "Game", "Heart",
+    "Blood", "Silent", "Golden", "Lost", "House", "Fire", "Storm", "Dream"
+]
+
+# Probability that a cast slot goes to a uniformly chosen person rather
+# than in proportion to credits so far, which sets how heavy the tail is
+UNIFORM_CHOICE = 0.3
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic Degrees dataset")
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=10000)
+    parser.add_argument("--movies", type=int,
+                        help="number of movies (default: people / 2)")
+    parser.add_argument("--cast", type=int, default=6,
+                        help="mean cast size per movie")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.directory, args.people, args.movies or args.people // 2,
+             args.cast, args.seed)
+    print(f"Wrote {args.people} people and "
+          f"{args.movies or args.people // 2} movies to {args.directory}")
+
+
+def generate(directory, people, movies, cast, seed=0):
+    """
+    Write people.csv, movies.csv and stars.csv to `directory`.
+
+    Cast slots are filled by preferential attachment: most go to people
+    in proportion to the credits they already have, so credits per
+    person follow a power law with a few very prolific stars.
+    """
+    random.seed(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            birth = random.randint(1900, 2005) if random.random() < 0.9 else ""
+            writer.writerow([person_id(person), name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movies):
+            title = " ".join(random.sample(TITLE_WORDS, random.randint(1, 3)))
+            writer.writerow([movie_id(movie), title, random.randint(1920, 2020)])
+
+    # Every credit given so far, so that a uniform pick from it chooses
+    # people in proportion to their credits
+    credits = array("i")
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            size = max(1, round(random.expovariate(1 / cast)))
+            members = set()
+            for _ in range(size):
+                if not credits or random.random() < UNIFORM_CHOICE:
+                    members.add(random.randrange(people))
+                else:
+                    members.add(credits[random.randrange(len(credits))])
+            for person in members:
+                credits.append(person)
+                writer.writerow([person_id(person), movie_id(movie)])
+
+
+def person_id(person):
+    """
+    Return the IMDB-style id of synthetic person `person`.
+    """
+    return str(100 + person)
+
+
+def movie_id(movie):
+    """
+    Return the IMDB-style id of synthetic movie `movie`.
+    """
+    return str(1000000 + movie)
+
+
+if __name__ == "__main__":
+    main()
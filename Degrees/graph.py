@@ -0,0 +1,391 @@
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+
+# Typecode used for every integer array in the graph
+INDEX_TYPE = "i"
+
+# Binary snapshot written next to the CSV files after the first load
+SNAPSHOT_NAME = "snapshot.bin"
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_VERSION = 1
+
+# Files a snapshot is built from
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Array and string table attributes stored in a snapshot
+ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_stars"]
+STRINGS = ["person_ids", "person_names", "person_births",
+           "movie_ids", "movie_titles", "movie_years"]
+
+
+class Graph():
+
+    def __init__(self):
+        """
+        Create an empty graph of people and movies.
+
+        People and movies are numbered densely from 0 in file order, and
+        the string IMDB ids are only kept in `person_ids` / `movie_ids`.
+        Adjacency is stored in CSR form (offsets + indices), so the
+        movies of person `p` are
+            person_movies[person_offsets[p]:person_offsets[p + 1]]
+        and the stars of movie `m` are
+            movie_stars[movie_offsets[m]:movie_offsets[m + 1]]
+        """
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # Maps string ids to integer indices
+        self.person_index = {}
+        self.movie_index = {}
+
+        # Maps lowercased names to a list of person indices
+        # Eg: 'kevin bacon': [0]
+        self.names = {}
+
+        self.person_offsets = array(INDEX_TYPE, [0])
+        self.person_movies = array(INDEX_TYPE)
+        self.movie_offsets = array(INDEX_TYPE, [0])
+        self.movie_stars = array(INDEX_TYPE)
+
+        # Optional landmark distance index, see landmarks.py
+        self.landmarks = None
+
+    def load(self, directory, cache=True):
+        """
+        Load the graph stored in `directory`.
+
+        If `cache` is set, map the binary snapshot in `directory` when
+        it is up to date with the CSV files, and otherwise parse the CSV
+        files and write a fresh snapshot for the next load.
+        """
+        path = os.path.join(directory, SNAPSHOT_NAME)
+        if cache and self.map_snapshot(path, directory):
+            return
+        self.parse(directory)
+        if cache:
+            try:
+                self.save_snapshot(path, directory)
+            except OSError:
+                # A read-only dataset is still usable, just not cached
+                pass
+
+    def parse(self, directory):
+        """
+        Load people.csv, movies.csv and stars.csv from `directory`.
+        """
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                index = len(self.person_ids)
+                self.person_index[row["id"]] = index
+                self.person_ids.append(row["id"])
+                self.person_names.append(row["name"])
+                self.person_births.append(row["birth"])
+                self.names.setdefault(row["name"].lower(), []).append(index)
+
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                self.movie_index[row["id"]] = len(self.movie_ids)
+                self.movie_ids.append(row["id"])
+                self.movie_titles.append(row["title"])
+                self.movie_years.append(row["year"])
+
+        # Collect (person, movie) pairs, skipping unknown ids
+        star_people = array(INDEX_TYPE)
+        star_movies = array(INDEX_TYPE)
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                try:
+                    person = self.person_index[row["person_id"]]
+                    movie = self.movie_index[row["movie_id"]]
+                except KeyError:
+                    continue
+                star_people.append(person)
+                star_movies.append(movie)
+
+        self.person_offsets, self.person_movies = build_csr(
+            star_people, star_movies, len(self.person_ids))
+        self.movie_offsets, self.movie_stars = build_csr(
+            star_movies, star_people, len(self.movie_ids))
+
+    def save_snapshot(self, path, directory):
+        """
+        Write the graph to `path` as a header followed by the raw
+        integer arrays and NUL separated string tables, recording the
+        CSV files in `directory` it was built from.
+        """
+        write_sections(path, directory,
+                       {name: getattr(self, name) for name in ARRAYS},
+                       {name: getattr(self, name) for name in STRINGS})
+
+    def map_snapshot(self, path, directory):
+        """
+        Map the snapshot at `path` into the graph if it exists, has the
+        current version and matches the CSV files in `directory`.
+
+        Returns whether the snapshot was used.
+        """
+        mapped = map_sections(path, directory, ARRAYS, STRINGS)
+        if mapped is None:
+            return False
+        self.snapshot, sections = mapped
+        for name, section in sections.items():
+            setattr(self, name, section)
+
+        self.person_index = {
+            person_id: index for index, person_id in enumerate(self.person_ids)
+        }
+        self.movie_index = {
+            movie_id: index for index, movie_id in enumerate(self.movie_ids)
+        }
+        self.names = {}
+        for index, name in enumerate(self.person_names):
+            self.names.setdefault(name.lower(), []).append(index)
+        return True
+
+    def movies_of(self, person):
+        """
+        Return the movie indices person index `person` starred in.
+        """
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Return the person indices that starred in movie index `movie`.
+        """
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for everyone who starred
+        with person index `person`, including `person` themself.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def name_of(self, person_id):
+        """
+        Return the name of the person with IMDB id `person_id`.
+        """
+        return self.person_names[self.person_index[person_id]]
+
+    def title_of(self, movie_id):
+        """
+        Return the title of the movie with IMDB id `movie_id`.
+        """
+        return self.movie_titles[self.movie_index[movie_id]]
+
+
+def build_csr(rows, cols, size):
+    """
+    Group `cols` by `rows` into CSR (offsets, indices) arrays with
+    `size` rows. Each row is sorted and duplicate entries are dropped.
+    """
+    # Counting sort of the pairs by row
+    offsets = array(INDEX_TYPE, [0]) * (size + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+    cursor = offsets[:-1]
+    grouped = array(INDEX_TYPE, [0]) * len(cols)
+    for row, col in zip(rows, cols):
+        grouped[cursor[row]] = col
+        cursor[row] += 1
+
+    # Sort and deduplicate every row
+    indices = array(INDEX_TYPE)
+    compact = array(INDEX_TYPE, [0])
+    for i in range(size):
+        indices.extend(sorted(set(grouped[offsets[i]:offsets[i + 1]])))
+        compact.append(len(indices))
+    return compact, indices
+
+
+def read_header(data, magic=SNAPSHOT_MAGIC, version=SNAPSHOT_VERSION):
+    """
+    Return the header of mapped binary `data` written by write_header,
+    with "start" set to the offset of the first section after it, or
+    None if `data` does not start with `magic` and `version`.
+    """
+    prefix = len(magic) + 8
+    if len(data) < prefix or data[:len(magic)] != magic:
+        return None
+    found, size = struct.unpack("<II", data[len(magic):prefix])
+    if found != version:
+        return None
+    header = json.loads(data[prefix:prefix + size])
+    header["start"] = prefix + size
+    return header
+
+
+def write_header(f, header, magic=SNAPSHOT_MAGIC, version=SNAPSHOT_VERSION):
+    """
+    Write `magic`, `version` and the JSON `header` to file `f`, padded
+    so that the sections following it stay 8 byte aligned.
+    """
+    data = json.dumps(header).encode("utf-8")
+    data += b" " * (-(len(magic) + 8 + len(data)) % 8)
+    f.write(magic)
+    f.write(struct.pack("<II", version, len(data)))
+    f.write(data)
+
+
+def write_sections(path, directory, arrays, strings, magic=SNAPSHOT_MAGIC,
+                   version=SNAPSHOT_VERSION):
+    """
+    Write a header recording the CSV files in `directory`, then the
+    integer arrays in the dictionary `arrays` and the NUL separated
+    lists of strings in `strings`, to `path` through a temporary file.
+    """
+    sections = []
+    for name, values in arrays.items():
+        sections.append((name, len(values),
+                         array(INDEX_TYPE, values).tobytes()))
+    for name, values in strings.items():
+        sections.append((name, len(values),
+                         "\0".join(values).encode("utf-8")))
+
+    # Lay sections out on 8 byte boundaries after the header
+    layout = {}
+    position = 0
+    for name, count, data in sections:
+        layout[name] = [position, count, len(data)]
+        position += -len(data) % 8 + len(data)
+    header = {
+        "itemsize": array(INDEX_TYPE).itemsize,
+        "sources": source_signature(directory, hashes=True),
+        "sections": layout
+    }
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        write_header(f, header, magic, version)
+        for name, count, data in sections:
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(temporary, path)
+
+
+def map_sections(path, directory, arrays, strings, magic=SNAPSHOT_MAGIC,
+                 version=SNAPSHOT_VERSION):
+    """
+    Map the file at `path` written by write_sections, if it exists,
+    starts with `magic` and `version` and matches the CSV files in
+    `directory`.
+
+    Returns the mapping and a dictionary of its sections, where those
+    named in `arrays` are used in place and those named in `strings`
+    are decoded once into lists, or None if the file cannot be used.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    header = read_header(data, magic, version)
+    if (header is None or header["itemsize"] != array(INDEX_TYPE).itemsize or
+            not is_fresh(path, header, directory, magic, version)):
+        data.close()
+        return None
+
+    start = header["start"]
+    view = memoryview(data)
+    sections = {}
+    for name in arrays:
+        position, count, length = header["sections"][name]
+        sections[name] = view[start + position:
+                              start + position + length].cast(INDEX_TYPE)
+    for name in strings:
+        position, count, length = header["sections"][name]
+        section = data[start + position:start + position + length]
+        sections[name] = section.decode("utf-8").split("\0") if count else []
+    return data, sections
+
+
+def source_signature(directory, hashes):
+    """
+    Return the size and modification time of each CSV file in
+    `directory`, plus its SHA-1 digest if `hashes` is set.
+    """
+    signature = {}
+    for name in SOURCES:
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        signature[name] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        if hashes:
+            digest = hashlib.sha1()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            signature[name]["sha1"] = digest.hexdigest()
+    return signature
+
+
+def is_fresh(path, header, directory, magic=SNAPSHOT_MAGIC,
+             version=SNAPSHOT_VERSION):
+    """
+    Return whether the CSV files in `directory` still match the sources
+    recorded in `header`, read from the file at `path`.
+
+    Files whose size or modification time changed are hashed, so
+    touching a file does not invalidate the file at `path`. If they
+    still match, their new size and modification time are written into
+    its header, so that later loads do not hash them again.
+    """
+    recorded = header["sources"]
+    try:
+        current = source_signature(directory, hashes=False)
+    except OSError:
+        return False
+    if all(
+        name in recorded and
+        recorded[name]["size"] == current[name]["size"] and
+        recorded[name]["mtime"] == current[name]["mtime"]
+        for name in SOURCES
+    ):
+        return True
+    hashed = source_signature(directory, hashes=True)
+    if not all(
+        name in recorded and recorded[name]["sha1"] == hashed[name]["sha1"]
+        for name in SOURCES
+    ):
+        return False
+    rewrite_header(path, dict(header, sources=hashed), magic, version)
+    return True
+
+
+def rewrite_header(path, header, magic=SNAPSHOT_MAGIC,
+                   version=SNAPSHOT_VERSION):
+    """
+    Replace the header of the file at `path`, written by write_header,
+    with `header` in place, if it fits in the space of the old one.
+    """
+    size = header["start"] - len(magic) - 8
+    data = json.dumps(
+        {key: value for key, value in header.items() if key != "start"}
+    ).encode("utf-8")
+    if len(data) > size:
+        return
+    try:
+        with open(path, "r+b") as f:
+            f.seek(len(magic) + 8)
+            f.write(data + b" " * (size - len(data)))
+    except OSError:
+        # A read-only dataset keeps hashing its files on every load
+        pass
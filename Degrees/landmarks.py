@@ -0,0 +1,176 @@
+import argparse
+import mmap
+import os
+from array import array
+from multiprocessing import Pool
+
+from graph import Graph, is_fresh, read_header, source_signature, write_header
+from search import UNREACHABLE, breadth_first_tree
+
+# Landmark index written next to the CSV files by `python landmarks.py`
+LANDMARKS_NAME = "landmarks.bin"
+LANDMARKS_MAGIC = b"LANDMARK"
+LANDMARKS_VERSION = 1
+
+# Number of hub actors used when building an index
+LANDMARK_COUNT = 32
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the landmark distance index for a dataset")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--count", type=int, default=LANDMARK_COUNT,
+                        help="number of hub actors to use as landmarks")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print("Loading data...")
+    graph = Graph()
+    graph.load(args.directory)
+    print("Data loaded.")
+    index = LandmarkIndex.build(graph, args.directory, args.count,
+                                args.processes)
+    index.save(args.directory)
+    print(f"Wrote {len(index.landmarks)} landmarks to "
+          f"{os.path.join(args.directory, LANDMARKS_NAME)}")
+
+
+class LandmarkIndex():
+
+    def __init__(self, landmarks, distances):
+        """
+        Create an index from a list of landmark person indices and, for
+        each landmark, a sequence holding its degrees of separation to
+        every person index (UNREACHABLE if not connected).
+        """
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, directory, count=LANDMARK_COUNT, processes=None):
+        """
+        Choose the `count` people with the most co-star credits as
+        landmarks and search from each of them.
+        """
+        landmarks = sorted(
+            range(len(graph.person_ids)),
+            key=lambda person: sum(len(graph.stars_of(movie))
+                                   for movie in graph.movies_of(person)),
+            reverse=True
+        )[:count]
+        with Pool(processes, initializer=load_worker,
+                  initargs=(directory,)) as pool:
+            distances = pool.map(landmark_distances, landmarks)
+        return cls(landmarks, distances)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Map the index saved in `directory`.
+
+        Returns None if there is no index, or if it was built from
+        different CSV files.
+        """
+        path = os.path.join(directory, LANDMARKS_NAME)
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        header = read_header(data, LANDMARKS_MAGIC, LANDMARKS_VERSION)
+        if header is None or not is_fresh(path, header, directory,
+                                          LANDMARKS_MAGIC, LANDMARKS_VERSION):
+            data.close()
+            return None
+
+        people = header["people"]
+        view = memoryview(data)
+        distances = [
+            view[header["start"] + i * people:header["start"] + (i + 1) * people]
+            for i in range(len(header["landmarks"]))
+        ]
+        index = cls(header["landmarks"], distances)
+        index.data = data
+        return index
+
+    def save(self, directory):
+        """
+        Write the index to `directory`, recording the CSV files it
+        was built from.
+        """
+        path = os.path.join(directory, LANDMARKS_NAME)
+        header = {
+            "landmarks": self.landmarks,
+            "people": len(self.distances[0]) if self.distances else 0,
+            "sources": source_signature(directory, hashes=True)
+        }
+        with open(f"{path}.tmp", "wb") as f:
+            write_header(f, header, LANDMARKS_MAGIC, LANDMARKS_VERSION)
+            for distances in self.distances:
+                f.write(bytes(distances))
+        os.replace(f"{path}.tmp", path)
+
+    def lower_bound(self, a, b):
+        """
+        Return a lower bound on the degrees of separation between person
+        indices `a` and `b`, or None if they cannot be connected.
+        """
+        bound = 0
+        for distances in self.distances:
+            da, db = distances[a], distances[b]
+            if (da == UNREACHABLE) != (db == UNREACHABLE):
+                return None
+            if da != UNREACHABLE:
+                bound = max(bound, abs(da - db))
+        return bound
+
+    def upper_bound(self, a, b):
+        """
+        Return an upper bound on the degrees of separation between person
+        indices `a` and `b` through some landmark, or None if no
+        landmark connects them.
+        """
+        distances = self.nearest(a, b)
+        if distances is None:
+            return None
+        return distances[a] + distances[b]
+
+    def nearest(self, a, b):
+        """
+        Return the distances of the landmark on the shortest path from
+        person index `a` to person index `b` through any landmark, or
+        None if no landmark connects them.
+        """
+        best = None
+        for distances in self.distances:
+            da, db = distances[a], distances[b]
+            if da != UNREACHABLE and db != UNREACHABLE:
+                if best is None or da + db < best[a] + best[b]:
+                    best = distances
+        return best
+
+
+def load_worker(directory):
+    """
+    Load the graph in a worker process building landmark distances.
+    """
+    global graph
+    graph = Graph()
+    graph.load(directory)
+
+
+def landmark_distances(landmark):
+    """
+    Return the degrees of separation from `landmark` to every person
+    index as bytes.
+    """
+    depth, _, _ = breadth_first_tree(graph, landmark)
+    return array("B", [
+        UNREACHABLE if degrees == -1 else min(degrees, UNREACHABLE - 1)
+        for degrees in depth
+    ]).tobytes()
+
+
+if __name__ == "__main__":
+    main()
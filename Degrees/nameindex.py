@@ -0,0 +1,226 @@
+import os
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import merge, nlargest
+from itertools import groupby, islice
+
+from graph import INDEX_TYPE, map_sections, write_sections
+
+# Name index written next to the CSV files on the first load
+NAMES_NAME = "names.bin"
+NAMES_MAGIC = b"DEGNAMES"
+NAMES_VERSION = 1
+
+# Array and string table attributes stored in the index file
+ARRAYS = ["key_offsets", "key_people", "trigram_offsets", "postings"]
+STRINGS = ["keys", "trigram_names"]
+
+# Prefix matches considered before ranking, so short prefixes stay fast
+PREFIX_SCAN = 200
+
+# Most names read from the posting lists of a query's trigrams, rarest
+# first, when looking for fuzzy matches, so that a query made of common
+# trigrams stays fast
+FUZZY_SCAN = 5000
+
+# Names sharing the most of those trigrams that are scored in full
+FUZZY_CANDIDATES = 50
+
+# Smallest trigram similarity reported as a fuzzy match
+FUZZY_THRESHOLD = 0.3
+
+
+class NameIndex():
+
+    def __init__(self, graph, keys, key_offsets, key_people, trigram_names,
+                 trigram_offsets, postings):
+        """
+        Create an index over the names of the people in `graph` from
+        the sorted list of distinct normalized names `keys`, where the
+        people with name `k`, most credited first, are
+            key_people[key_offsets[k]:key_offsets[k + 1]]
+        and the names containing trigram_names[t] are
+            postings[trigram_offsets[t]:trigram_offsets[t + 1]]
+        """
+        self.graph = graph
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.key_people = key_people
+        self.trigram_names = trigram_names
+        self.trigram_offsets = trigram_offsets
+        self.postings = postings
+        self.trigrams = {
+            trigram: postings[trigram_offsets[t]:trigram_offsets[t + 1]]
+            for t, trigram in enumerate(trigram_names)
+        }
+
+    @classmethod
+    def build(cls, graph):
+        """
+        Index the names of every person in `graph` for exact, prefix
+        and trigram lookups on their normalized form.
+        """
+        normalized = {}
+        people = {}
+        for person, name in enumerate(graph.person_names):
+            if name not in normalized:
+                normalized[name] = normalize(name)
+            people.setdefault(normalized[name], []).append(person)
+        keys = sorted(people)
+        credits = graph.person_offsets
+
+        key_offsets = array(INDEX_TYPE, [0])
+        key_people = array(INDEX_TYPE)
+        postings = {}
+        for k, key in enumerate(keys):
+            key_people.extend(sorted(
+                people[key],
+                key=lambda person: credits[person] - credits[person + 1]))
+            key_offsets.append(len(key_people))
+            for trigram in trigrams(key):
+                postings.setdefault(trigram, []).append(k)
+
+        trigram_names = sorted(postings)
+        trigram_offsets = array(INDEX_TYPE, [0])
+        flat = array(INDEX_TYPE)
+        for trigram in trigram_names:
+            flat.extend(postings[trigram])
+            trigram_offsets.append(len(flat))
+        return cls(graph, keys, key_offsets, key_people, trigram_names,
+                   trigram_offsets, flat)
+
+    @classmethod
+    def load(cls, directory, graph):
+        """
+        Map the index saved in `directory` for `graph`.
+
+        Returns None if there is no index, or if it was built from
+        different CSV files.
+        """
+        mapped = map_sections(os.path.join(directory, NAMES_NAME), directory,
+                              ARRAYS, STRINGS, NAMES_MAGIC, NAMES_VERSION)
+        if mapped is None:
+            return None
+        data, sections = mapped
+        index = cls(graph, **sections)
+        index.data = data
+        return index
+
+    def save(self, directory):
+        """
+        Write the index to `directory`, recording the CSV files it
+        was built from.
+        """
+        write_sections(os.path.join(directory, NAMES_NAME), directory,
+                       {name: getattr(self, name) for name in ARRAYS},
+                       {name: getattr(self, name) for name in STRINGS},
+                       NAMES_MAGIC, NAMES_VERSION)
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` person indices whose names match `query`,
+        best first: exact matches, then names starting with `query`,
+        then names sharing enough trigrams with it. Ties go to the
+        person with the most movies.
+        """
+        scores = self.scores(query, limit)
+        credits = self.graph.person_offsets
+        ranked = []
+        for _, keys in groupby(sorted(scores, key=scores.get, reverse=True),
+                               key=scores.get):
+            # Each name's people are already ordered by credits
+            ranked.extend(islice(merge(
+                *(self.people_of(key) for key in keys),
+                key=lambda person: credits[person] - credits[person + 1]
+            ), limit - len(ranked)))
+            if len(ranked) >= limit:
+                break
+        return ranked
+
+    def matches(self, query):
+        """
+        Return the person indices of the best kind of match for `query`:
+        everyone whose name is `query` once normalized, or failing that
+        everyone whose name starts with it, or failing that everyone
+        with the most similar name.
+        """
+        scores = self.scores(query, 1)
+        if not scores:
+            return []
+        best = max(scores.values())
+        return [person for key in scores if scores[key] == best
+                for person in self.people_of(key)]
+
+    def scores(self, query, limit):
+        """
+        Return a dictionary from name indices matching `query` to their
+        score, a (kind, similarity) pair where kind is 2 for an exact
+        match, 1 for a prefix and 0 for a fuzzy match. Fuzzy matches are
+        only looked for when fewer than `limit` people match otherwise.
+        """
+        key = normalize(query)
+        scores = {}
+        found = 0
+
+        # Exact and prefix matches sit together in sorted order
+        start = bisect_left(self.keys, key)
+        for k in range(start, min(start + PREFIX_SCAN, len(self.keys))):
+            if not self.keys[k].startswith(key):
+                break
+            scores[k] = (2 if self.keys[k] == key else 1, 1.0)
+            found += self.key_offsets[k + 1] - self.key_offsets[k]
+
+        if found < limit:
+            wanted = trigrams(key)
+            hits = Counter()
+            budget = FUZZY_SCAN
+            for trigram in sorted(wanted, key=lambda trigram: len(
+                    self.trigrams.get(trigram, ()))):
+                postings = self.trigrams.get(trigram, ())
+                if len(postings) > budget:
+                    if not hits:
+                        hits.update(postings[:budget])
+                    break
+                hits.update(postings)
+                budget -= len(postings)
+            for k in nlargest(FUZZY_CANDIDATES, hits, key=hits.__getitem__):
+                if k in scores:
+                    continue
+                similarity = dice(wanted, trigrams(self.keys[k]))
+                if similarity >= FUZZY_THRESHOLD:
+                    scores[k] = (0, similarity)
+        return scores
+
+    def people_of(self, key):
+        """
+        Return the person indices with the name at index `key`.
+        """
+        return self.key_people[self.key_offsets[key]:
+                               self.key_offsets[key + 1]]
+
+
+def normalize(name):
+    """
+    Return `name` lowercased, without accents and with single spaces.
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.lower().split())
+
+
+def trigrams(text):
+    """
+    Return the set of three character substrings of `text`, padded so
+    that the start and end of the text count too.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(a, b):
+    """
+    Return the Dice similarity of sets `a` and `b`.
+    """
+    return 2 * len(a & b) / (len(a) + len(b))
@@ -0,0 +1,344 @@
+from array import array
+
+from graph import INDEX_TYPE
+from util import Node, IndexedQueueFrontier
+
+# Distance a landmark index stores for people it cannot reach
+UNREACHABLE = 255
+
+
+class SearchStats():
+    """
+    Counters a search fills in when given one, to compare engines.
+    """
+    def __init__(self):
+        # People expanded, movie casts scanned and cast entries scanned
+        self.people = 0
+        self.movies = 0
+        self.stars = 0
+        # (movie, person) neighbour tuples allocated
+        self.tuples = 0
+        # Wall time of the search
+        self.seconds = 0
+
+    def expanded(self, graph, person):
+        """
+        Count expanding person index `person` through Graph.neighbors,
+        which scans every cast the person is in and yields a tuple per
+        cast member.
+        """
+        offsets = graph.movie_offsets
+        self.people += 1
+        for movie in graph.movies_of(person):
+            cast = offsets[movie + 1] - offsets[movie]
+            self.movies += 1
+            self.stars += cast
+            self.tuples += cast
+
+
+def breadth_first_search(graph, source, target, stats=None):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect person index `source` to person index `target`, searching
+    outwards from the source only.
+
+    If no possible path, returns None.
+    """
+    # keep track of explored states
+    explored = set()
+
+    start = Node(state = source, parent = None, action = None)
+    frontier = IndexedQueueFrontier()
+    frontier.add(start)
+    while True:
+        # Remove a node from the frontier
+        if frontier.empty():
+            break
+        node = frontier.remove()
+        explored.add(node.state)
+
+        if node.state == target:
+            return path_to(node)
+
+        if stats is not None:
+            stats.expanded(graph, node.state)
+        for action,state in graph.neighbors(node.state):
+            # Check if the the node is already visited or already in frontier(stack/queue)
+            if not frontier.contains_state(state) and state not in explored:
+                child = Node(state=state, parent=node,action=action)
+                if child.state == target:
+                    return path_to(child)
+                frontier.add(child)
+
+
+def bidirectional_search(graph, source, target, stats=None):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect `source` to `target`, growing one search from each end
+    and stopping where they meet.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to (movie, person) one step closer to
+    # the end the search started from, and to its distance from there
+    forward = {source: None}
+    backward = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_level = [source]
+    backward_level = [target]
+
+    while forward_level and backward_level:
+        # Always grow the side with the smaller frontier
+        if len(forward_level) <= len(backward_level):
+            forward_level, meeting = expand_level(
+                graph, forward_level, forward, forward_depth, backward_depth,
+                stats=stats)
+            if meeting is not None:
+                person, movie, other = meeting
+                return (chain(forward, person, reverse=True) + [(movie, other)] +
+                        chain(backward, other, reverse=False))
+        else:
+            backward_level, meeting = expand_level(
+                graph, backward_level, backward, backward_depth, forward_depth,
+                stats=stats)
+            if meeting is not None:
+                person, movie, other = meeting
+                return (chain(forward, other, reverse=True) + [(movie, person)] +
+                        chain(backward, person, reverse=False))
+    return None
+
+
+def landmark_search(graph, source, target, stats=None):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect `source` to `target`, using the landmark index in
+    `graph.landmarks` to cut a bidirectional search short.
+
+    The index shows at once when the two are not connected, and gives
+    the length of a path through the landmark nearest both ends, an
+    upper bound on their separation. Once the two sides of the search
+    have grown far enough without meeting that no shorter path can be
+    left, the search stops before its last and largest level and the
+    path through the landmark is returned instead.
+
+    If no possible path, returns None.
+    """
+    index = graph.landmarks
+    if index is None:
+        raise Exception("no landmark index, build one with landmarks.py")
+    if source == target:
+        return []
+    if index.lower_bound(source, target) is None:
+        return None
+    distances = index.nearest(source, target)
+    if distances is None or \
+            distances[source] + distances[target] >= UNREACHABLE - 1:
+        return bidirectional_search(graph, source, target, stats)
+    upper = distances[source] + distances[target]
+
+    forward = {source: None}
+    backward = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_level = [source]
+    backward_level = [target]
+
+    while forward_level and backward_level:
+        # The sides have not met, so every path is longer than the
+        # depths they have reached added together
+        if forward_depth[forward_level[0]] + \
+                backward_depth[backward_level[0]] + 1 >= upper:
+            return landmark_path(graph, distances, source, target, stats)
+        if len(forward_level) <= len(backward_level):
+            forward_level, meeting = expand_level(
+                graph, forward_level, forward, forward_depth, backward_depth,
+                stats)
+            if meeting is not None:
+                person, movie, other = meeting
+                return (chain(forward, person, reverse=True) + [(movie, other)] +
+                        chain(backward, other, reverse=False))
+        else:
+            backward_level, meeting = expand_level(
+                graph, backward_level, backward, backward_depth, forward_depth,
+                stats)
+            if meeting is not None:
+                person, movie, other = meeting
+                return (chain(forward, other, reverse=True) + [(movie, person)] +
+                        chain(backward, person, reverse=False))
+    return None
+
+
+def landmark_path(graph, distances, source, target, stats=None):
+    """
+    Returns (movie, person) index pairs leading from `source` through a
+    landmark to `target`, where `distances` holds the degrees of
+    separation from the landmark to every person, by stepping from each
+    end to someone one degree closer to the landmark until reaching it.
+    """
+    def descend(person):
+        steps = []
+        while distances[person]:
+            if stats is not None:
+                stats.expanded(graph, person)
+            for movie, star in graph.neighbors(person):
+                if distances[star] == distances[person] - 1:
+                    steps.append((movie, person, star))
+                    person = star
+                    break
+        return steps
+
+    return [(movie, star) for movie, _, star in descend(source)] + \
+        [(movie, person) for movie, person, _ in reversed(descend(target))]
+
+
+def bipartite_search(graph, source, target, stats=None):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect `source` to `target`, searching outwards from the source
+    over people and movies alike.
+
+    Movies are marked as visited, so each cast is scanned at most once
+    per search however many of its members are expanded, and no
+    neighbour tuples are built along the way.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+    parents = {source: None}
+    seen_movies = set()
+    level = [source]
+    while level:
+        next_level = []
+        for person in level:
+            if stats is not None:
+                stats.people += 1
+            for movie in graph.movies_of(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                cast = graph.stars_of(movie)
+                if stats is not None:
+                    stats.movies += 1
+                    stats.stars += len(cast)
+                for star in cast:
+                    if star not in parents:
+                        parents[star] = (movie, person)
+                        if star == target:
+                            return chain(parents, target, reverse=True)
+                        next_level.append(star)
+        level = next_level
+    return None
+
+
+def expand_level(graph, level, parents, depth, other_depth, stats=None):
+    """
+    Expand every person in `level` by one step, recording new people in
+    `parents` and `depth`.
+
+    Returns the next level and, if this side touched the people reached
+    by the other side, the (person, movie, other) step of the shortest
+    such connection, where `person` is on this side and `other` on the
+    other side.
+    """
+    next_level = []
+    meeting = None
+    for person in level:
+        if stats is not None:
+            stats.expanded(graph, person)
+        for movie, star in graph.neighbors(person):
+            if star in other_depth:
+                if meeting is None or other_depth[star] < other_depth[meeting[2]]:
+                    meeting = (person, movie, star)
+            if star not in parents:
+                parents[star] = (movie, person)
+                depth[star] = depth[person] + 1
+                next_level.append(star)
+    return next_level, meeting
+
+
+def chain(parents, person, reverse):
+    """
+    Follow `parents` from `person` back to the root of its search.
+
+    Returns (movie, person) pairs ordered from the root to `person` if
+    `reverse`, otherwise the pairs leading from `person` to the root.
+    """
+    steps = []
+    while parents[person] is not None:
+        movie, previous = parents[person]
+        steps.append((movie, person if reverse else previous))
+        person = previous
+    if reverse:
+        steps.reverse()
+    return steps
+
+
+def breadth_first_tree(graph, source, targets=None):
+    """
+    Search outwards from person index `source` until every person index
+    in `targets` has been reached, or the whole component if `targets`
+    is None.
+
+    Returns (depth, via_movie, via_person) arrays over all people, where
+    depth[p] is the degrees of separation of `p` (-1 if not reached) and
+    (via_movie[p], via_person[p]) is the step one closer to `source`.
+    """
+    size = len(graph.person_ids)
+    depth = array(INDEX_TYPE, [-1]) * size
+    via_movie = array(INDEX_TYPE, [-1]) * size
+    via_person = array(INDEX_TYPE, [-1]) * size
+    depth[source] = 0
+    remaining = None if targets is None else set(targets) - {source}
+
+    level = [source]
+    distance = 0
+    while level and remaining != set():
+        distance += 1
+        next_level = []
+        for person in level:
+            for movie, star in graph.neighbors(person):
+                if depth[star] == -1:
+                    depth[star] = distance
+                    via_movie[star] = movie
+                    via_person[star] = person
+                    next_level.append(star)
+                    if remaining is not None:
+                        remaining.discard(star)
+        level = next_level
+    return depth, via_movie, via_person
+
+
+def tree_path(tree, target):
+    """
+    Returns the (movie, person) index pairs leading from the source of
+    `tree`, as built by breadth_first_tree, to `target`.
+
+    If `target` was not reached, returns None.
+    """
+    depth, via_movie, via_person = tree
+    if depth[target] == -1:
+        return None
+    path = []
+    while depth[target] > 0:
+        path.append((via_movie[target], target))
+        target = via_person[target]
+    path.reverse()
+    return path
+
+
+def path_to(node):
+    """
+    Returns the (movie, person) pairs leading from
+    the root of the search to `node`.
+    """
+    path = []
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+    return path
@@ -0,0 +1,115 @@
+import argparse
+import csv
+import os
+import sys
+from multiprocessing import Pool
+
+import degrees
+from degrees import POLICIES, ensure_loaded, graph, load_data
+from search import breadth_first_tree
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Degrees of separation from many people at once")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--people",
+                        help="file with one IMDB id or name per line "
+                             "(default: everyone)")
+    parser.add_argument("--matrix",
+                        help="write the distance matrix between --people here")
+    parser.add_argument("--histogram",
+                        help="write the histogram of separations from "
+                             "--people to everyone here")
+    parser.add_argument("--resolve", choices=POLICIES,
+                        help="choose between people sharing a name "
+                             "instead of stopping")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if not args.matrix and not args.histogram:
+        parser.error("nothing to do, give --matrix and/or --histogram")
+    if args.matrix and not args.people:
+        parser.error("--matrix needs --people")
+
+    print("Loading data...")
+    load_data(args.directory)
+    print("Data loaded.")
+    if args.people:
+        people = read_people(args.people, args.resolve)
+    else:
+        people = list(range(len(graph.person_ids)))
+
+    histogram = {}
+    jobs = [(source, people if args.matrix else None, bool(args.histogram))
+            for source in people]
+    chunksize = max(1, len(jobs) // (4 * args.processes))
+    with Pool(args.processes, initializer=ensure_loaded,
+              initargs=(args.directory,)) as pool, \
+            open(args.matrix or os.devnull, "w", newline="") as f:
+        matrix = csv.writer(f)
+        matrix.writerow(["person_id"] + [graph.person_ids[person]
+                                         for person in people])
+        for source, row, counts in pool.imap(separations_from, jobs, chunksize):
+            matrix.writerow([graph.person_ids[source]] + row)
+            for degrees_apart, count in counts.items():
+                histogram[degrees_apart] = histogram.get(degrees_apart, 0) + count
+
+    if args.histogram:
+        with open(args.histogram, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["degrees", "pairs"])
+            for degrees_apart in sorted(histogram):
+                writer.writerow([degrees_apart, histogram[degrees_apart]])
+    print(f"Searched from {len(people)} people.")
+
+
+def read_people(filename, policy=None):
+    """
+    Return the person indices listed in `filename`, one IMDB id or
+    name per line. Names must be unambiguous unless `policy` names one
+    of POLICIES to choose between people sharing them.
+    """
+    people = []
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line in graph.person_index:
+                people.append(graph.person_index[line])
+                continue
+            person_ids = degrees.person_ids_for_name(line)
+            if len(person_ids) > 1 and policy is not None:
+                person_ids = [degrees.person_id_for_name(line, policy)]
+            if len(person_ids) != 1:
+                sys.exit(f"'{line}' does not name exactly one person.")
+            people.append(graph.person_index[person_ids[0]])
+    return people
+
+
+def separations_from(job):
+    """
+    Search from one source person index.
+
+    Returns the source, its row of the distance matrix (blank where not
+    connected) and a histogram of distances to everyone else if
+    requested. The source itself is left out of the histogram, so it
+    only counts pairs of different people.
+    """
+    source, targets, histogram = job
+    depth, _, _ = breadth_first_tree(
+        graph, source, None if histogram else targets)
+    row = []
+    if targets is not None:
+        row = [depth[target] if depth[target] != -1 else ""
+               for target in targets]
+    counts = {}
+    if histogram:
+        for degrees_apart in depth:
+            if degrees_apart > 0:
+                counts[degrees_apart] = counts.get(degrees_apart, 0) + 1
+    return source, row, counts
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import socket
+import signal
+import socketserver
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import degrees
+from degrees import (ENGINES, POLICIES, ensure_loaded, graph, load_data,
+                     shortest_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degrees of separation server")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket", help="listen on this Unix socket instead")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes answering path queries")
+    parser.add_argument("--resolve", choices=POLICIES,
+                        help="default way to choose between people sharing "
+                             "a name (default: report them as ambiguous)")
+    parser.add_argument("--engine", choices=ENGINES,
+                        help="default search for requests "
+                             "(default: landmarks if indexed, otherwise bidirectional)")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    load_data(args.directory)
+    print("Data loaded.")
+    if args.engine == "landmarks" and graph.landmarks is None:
+        sys.exit("No landmark index, run landmarks.py")
+
+    executor = ProcessPoolExecutor(args.workers, initializer=ensure_loaded,
+                                   initargs=(args.directory,))
+    if args.socket:
+        server = UnixHTTPServer(args.socket, PathHandler)
+        print(f"Serving on {args.socket}")
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), PathHandler)
+        print(f"Serving on http://{args.host}:{args.port}")
+    server.executor = executor
+    server.workers = args.workers
+    server.engine = args.engine or (
+        "landmarks" if graph.landmarks is not None else "bidirectional")
+    server.policy = args.resolve
+
+    # Shut down cleanly, workers included, when stopped by a service manager
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        executor.shutdown()
+        if args.socket:
+            os.unlink(args.socket)
+
+
+class PathHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /paths with a JSON body of the form
+        {"pairs": [["Kevin Bacon", "Tom Hanks"], ...], "engine": "bfs",
+         "resolve": "most-credited"}
+    where "engine" and "resolve" are optional, and responds with
+        {"results": [{"source": ..., "target": ..., "degrees": ...,
+                      "path": [{"movie_id": ..., "title": ...,
+                                "person_id": ..., "name": ...}, ...]}]}
+    in the order the pairs were given. Pairs that cannot be answered
+    carry an "error" instead of "degrees" and "path", along with
+    "candidates" for ambiguous names or "suggestions" for unknown ones.
+    """
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self.reply(404, {"error": "Not found"})
+        self.reply(200, {"people": len(graph.person_ids),
+                         "movies": len(graph.movie_ids)})
+
+    def do_POST(self):
+        if self.path != "/paths":
+            return self.reply(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            pairs = [(str(source), str(target))
+                     for source, target in request["pairs"]]
+            engine = request.get("engine", self.server.engine)
+            policy = request.get("resolve", self.server.policy)
+        except (KeyError, TypeError, ValueError):
+            return self.reply(400, {"error": "Expected {\"pairs\": [[source, target], ...]}"})
+        # Names are checked as strings first, since a list or object
+        # from the JSON body cannot be looked up in a dictionary
+        if not isinstance(engine, str) or engine not in ENGINES:
+            return self.reply(400, {"error": f"Unknown engine '{engine}'"})
+        if engine == "landmarks" and graph.landmarks is None:
+            return self.reply(400, {"error": "No landmark index, run landmarks.py"})
+        if policy is not None and (not isinstance(policy, str)
+                                   or policy not in POLICIES):
+            return self.reply(400, {"error": f"Unknown resolve policy '{policy}'"})
+
+        # Spread the batch over the worker processes
+        chunksize = max(1, len(pairs) // (4 * self.server.workers))
+        results = list(self.server.executor.map(
+            answer, pairs, [engine] * len(pairs), [policy] * len(pairs),
+            chunksize=chunksize))
+        self.reply(200, {"results": results})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer listening on a Unix socket path.
+    """
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        # HTTPServer.server_bind expects a (host, port) address
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def answer(pair, engine, policy):
+    """
+    Return the JSON result for one (source, target) pair of names,
+    choosing between people sharing a name by `policy` if given.
+    """
+    source_name, target_name = pair
+    result = {"source": source_name, "target": target_name}
+    ids = []
+    for name in pair:
+        candidates = resolve(name)
+        if not candidates and policy is not None:
+            candidates = [graph.person_ids[person]
+                          for person in degrees.name_index.matches(name)]
+        if not candidates:
+            result["error"] = f"Person '{name}' not found"
+            result["suggestions"] = degrees.suggest_names(name)
+            return result
+        if len(candidates) > 1 and policy is not None:
+            candidates = [degrees.person_id_for_name(name, policy)]
+        if len(candidates) > 1:
+            result["error"] = f"Name '{name}' is ambiguous"
+            result["candidates"] = candidates
+            return result
+        ids.append(candidates[0])
+
+    path = shortest_path(ids[0], ids[1], engine)
+    if path is None:
+        result["error"] = "Not connected"
+        return result
+    result["degrees"] = len(path)
+    result["path"] = [
+        {
+            "movie_id": movie_id,
+            "title": graph.title_of(movie_id),
+            "person_id": person_id,
+            "name": graph.name_of(person_id)
+        }
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def resolve(name):
+    """
+    Return the IMDB ids matching `name`, which may also be an IMDB id
+    so that ambiguous names can be passed unambiguously.
+    """
+    person_ids = degrees.person_ids_for_name(name)
+    if not person_ids and name in graph.person_index:
+        return [name]
+    return person_ids
+
+
+if __name__ == "__main__":
+    main()
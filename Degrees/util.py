@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -35,3 +38,47 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque plus a count of queued nodes per
+    state, so add, remove and contains_state all take constant time.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self.discard(node.state)
+            return node
+
+    def discard(self, state):
+        if self.states[state] == 1:
+            del self.states[state]
+        else:
+            self.states[state] -= 1
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.discard(node.state)
+            return node
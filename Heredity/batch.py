@@ -0,0 +1,120 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from elimination import JunctionTree, pedigree_structure
+from heredity import ENGINES, PROBS, load_data
+
+# Families handed to a worker process at a time
+CHUNKSIZE = 16
+
+# Junction trees compiled by this process, by pedigree structure, and
+# how many are kept before the oldest is dropped
+trees = {}
+TREE_CACHE = 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Probability of carrying the GJB2 gene for many families")
+    parser.add_argument("source",
+                        help="directory of family CSV files, or a manifest "
+                             "listing one per line")
+    parser.add_argument("--engine", choices=ENGINES, default="elimination",
+                        help="inference used (default: elimination)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--output",
+                        help="file to write the results to (default: stdout)")
+    args = parser.parse_args()
+
+    filenames = family_files(args.source)
+    jobs = [(filename, args.engine) for filename in filenames]
+    output = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    failed = 0
+    try:
+        if args.processes > 1:
+            with Pool(args.processes) as pool:
+                failed = write_results(
+                    pool.imap(infer_family, jobs, CHUNKSIZE), output)
+        else:
+            failed = write_results(map(infer_family, jobs), output)
+    finally:
+        if args.output:
+            output.close()
+    seconds = time.perf_counter() - start
+    print(f"{len(filenames)} families, {failed} failed, in {seconds:.2f}s",
+          file=sys.stderr)
+
+
+def family_files(source):
+    """
+    Return the family CSV files in the directory `source`, or listed in
+    the manifest `source`, one per line relative to the manifest, with
+    blank lines and lines starting with # skipped.
+    """
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.csv")))
+    directory = os.path.dirname(source)
+    with open(source) as f:
+        return [
+            os.path.join(directory, line.strip()) for line in f
+            if line.strip() and not line.startswith("#")
+        ]
+
+
+def write_results(results, output):
+    """
+    Write each JSON line of `results` to `output` as it arrives, and
+    return how many of them report an error.
+    """
+    failed = 0
+    for line, error in results:
+        output.write(line + "\n")
+        failed += error
+    return failed
+
+
+def infer_family(job):
+    """
+    Return the gene and trait distribution of everyone in a family CSV
+    file as a line of JSON, or the error reading it, and whether it
+    failed.
+    """
+    filename, engine = job
+    try:
+        people = load_data(filename)
+        probabilities = infer(people, engine)
+    except Exception as error:
+        # Name the type of any error not raised with a message of ours,
+        # as a KeyError's message is just the key
+        message = str(error) if type(error) is Exception else \
+            f"{type(error).__name__}: {error}"
+        return json.dumps({"file": filename, "error": message}), True
+    return json.dumps({"file": filename, "probabilities": probabilities}), \
+        False
+
+
+def infer(people, engine):
+    """
+    Return the gene and trait distribution of everyone in `people` by
+    `engine`, reusing the junction tree of any family with the same
+    structure already seen by this process for elimination.
+    """
+    if engine != "elimination":
+        return ENGINES[engine](people)
+    structure = pedigree_structure(people)
+    tree = trees.get(structure)
+    if tree is None:
+        if len(trees) >= TREE_CACHE:
+            del trees[next(iter(trees))]
+        tree = trees[structure] = JunctionTree(structure, PROBS)
+    return tree.marginals(people)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import glob
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from heredity import ENGINES, PROBS, joint_probability, load_data
+from vectorized import joint_probability as vectorized_joint_probability
+from vectorized import probability_tables
+
+# Scoring single assignments three ways, then whole families with
+# every engine in ENGINES
+SECTIONS = ["joint", "engines"]
+
+# Families benchmarked when none are given
+FAMILIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data",
+                        "family*.csv")
+
+# Times each measurement is repeated, keeping the fastest
+REPEAT = 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Heredity")
+    parser.add_argument("families", nargs="*",
+                        help="family CSV files (default: data/family*.csv)")
+    parser.add_argument("--section", action="append", choices=SECTIONS,
+                        help="run only this section; may be repeated")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    sections = args.section or SECTIONS
+    families = args.families or sorted(glob.glob(FAMILIES))
+
+    results = {}
+    for section in sections:
+        if section == "joint":
+            results["joint"] = benchmark_joint(families, args.repeat)
+        else:
+            results["engines"] = benchmark_engines(families, args.repeat)
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def benchmark_joint(families, repeat):
+    """
+    Print and return the time taken to score every assignment of genes
+    and traits in each family through the branching `calculate`, the
+    INHERITANCE lookup, and the vectorized joint probability, and how
+    far apart their scores are.
+    """
+    tables = probability_tables(PROBS)
+    results = {}
+    print("Family       People  Assignments   Branches      Table "
+          "Vectorized  Difference")
+    for filename in families:
+        people = load_data(filename)
+        names = list(people)
+        genes = np.array(list(itertools.product((0, 1, 2),
+                                                repeat=len(names))))
+        traits = np.array(list(itertools.product((False, True),
+                                                 repeat=len(names))))
+        genes = np.repeat(genes, len(traits), axis=0)
+        traits = np.tile(traits, (len(genes) // len(traits), 1))
+        assignments = [
+            ({name for name, g in zip(names, row) if g == 1},
+             {name for name, g in zip(names, row) if g == 2},
+             {name for name, t in zip(names, have) if t})
+            for row, have in zip(genes.tolist(), traits.tolist())
+        ]
+
+        scores = {}
+        seconds = {}
+        for name, score in [
+            ("branches", lambda: [branch_joint_probability(people, *a)
+                                  for a in assignments]),
+            ("table", lambda: [joint_probability(people, *a)
+                               for a in assignments]),
+            ("vectorized", lambda: vectorized_joint_probability(
+                people, genes, traits, tables))
+        ]:
+            seconds[name], scores[name] = fastest(repeat, score)
+        difference = max(
+            np.abs(np.array(scores[name]) - scores["branches"]).max()
+            for name in ("table", "vectorized")
+        )
+
+        family = os.path.basename(filename)
+        print(f"{family:<12} {len(names):6} {len(assignments):12} "
+              f"{seconds['branches']:9.4f}s {seconds['table']:9.4f}s "
+              f"{seconds['vectorized']:9.4f}s {difference:11.2e}")
+        results[family] = {"people": len(names),
+                           "assignments": len(assignments),
+                           "seconds": seconds, "difference": difference}
+    return results
+
+
+def benchmark_engines(families, repeat):
+    """
+    Print and return the time each inference engine takes on each
+    family, and the largest difference from the enumeration.
+    """
+    results = {}
+    print("Family       Engine         Seconds  Difference")
+    for filename in families:
+        people = load_data(filename)
+        family = os.path.basename(filename)
+        results[family] = {}
+        reference = ENGINES["enumeration"](people)
+        for engine in ENGINES:
+            seconds, probabilities = fastest(
+                repeat, lambda: ENGINES[engine](people))
+            difference = max(
+                abs(probabilities[person][field][value] -
+                    reference[person][field][value])
+                for person in people
+                for field in reference[person]
+                for value in reference[person][field]
+            )
+            print(f"{family:<12} {engine:<12} {seconds:9.4f}s "
+                  f"{difference:11.2e}")
+            results[family][engine] = {"seconds": seconds,
+                                       "difference": difference}
+    return results
+
+
+def fastest(repeat, function):
+    """
+    Return the shortest wall time of `repeat` calls to `function` and
+    the result of the last.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def branch_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute and return a joint probability as heredity.joint_probability
+    did before `calculate` looked the inheritance probability up in
+    INHERITANCE.
+
+    The probability returned should be the probability that
+        * everyone in set `one_gene` has one copy of the gene, and
+        * everyone in set `two_genes` has two copies of the gene, and
+        * everyone not in `one_gene` or `two_gene` does not have the gene, and
+        * everyone in set `have_trait` has the trait, and
+        * everyone not in set` have_trait` does not have the trait.
+    """
+    join_prob = 1
+    zero_gene = set(
+        [x for x in people.keys() if x not in one_gene and x not in two_genes])
+    for name in people.keys():
+        if name in zero_gene:
+            if people[name]['mother']:
+                join_prob *= branch_calculate(people, name,
+                                              zero_gene, one_gene, two_genes, 0)
+            else:
+                join_prob *= PROBS['gene'][0]
+            if name in have_trait:
+                join_prob *= PROBS['trait'][0][True]
+            else:
+                join_prob *= PROBS['trait'][0][False]
+        # If person has one copy of gene
+        elif name in one_gene:
+            if people[name]['mother']:
+                join_prob *= branch_calculate(people, name,
+                                              zero_gene, one_gene, two_genes, 1)
+            else:
+                join_prob *= PROBS['gene'][1]
+            if name in have_trait:
+                join_prob *= PROBS['trait'][1][True]
+            else:
+                join_prob *= PROBS['trait'][1][False]
+        elif name in two_genes:
+            if people[name]['mother']:
+                join_prob *= branch_calculate(people, name,
+                                              zero_gene, one_gene, two_genes, 2)
+            else:
+                join_prob *= PROBS['gene'][2]
+            if name in have_trait:
+                join_prob *= PROBS['trait'][2][True]
+            else:
+                join_prob *= PROBS['trait'][2][False]
+    return join_prob
+
+
+def branch_calculate(people, name, zero_gene, one_gene, two_genes,
+                     in_gene):
+    """
+    Return the probability that `name` has `in_gene` copies of the gene
+    by walking every combination of their parents' copies.
+    """
+    join_prob = 1
+    father = people[name]['father']
+    mother = people[name]['mother']
+    if in_gene == 0:
+        # Possible ways child can get 0 genes
+        if father in zero_gene:
+            # Father - Zero gene
+            if mother in zero_gene:
+                # Mother - Zero gene
+                join_prob = (1 - PROBS['mutation']) * (1 - PROBS['mutation'])
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = (1 - PROBS['mutation']) * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = (1 - PROBS['mutation']) * PROBS['mutation']
+        elif father in one_gene:
+            # Father - One gene
+            if mother in zero_gene:
+                # Mother - Zero gene
+                join_prob = 0.5 * (1 - PROBS['mutation'])
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = 0.5 * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = 0.5 * PROBS['mutation']
+        elif father in two_genes:
+            # Father - 2 gene
+            if mother in zero_gene:
+                # Mother - 0 gene
+                join_prob = PROBS['mutation'] * (1 - PROBS['mutation'])
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = PROBS['mutation'] * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = PROBS['mutation'] * PROBS['mutation']
+    elif in_gene == 1:
+        # Possible ways child can get 1 genes
+        if father in zero_gene:
+            # Father - Zero gene
+            if mother in zero_gene:
+                # Mother - Zero gene
+                join_prob = PROBS['mutation'] * (1 - PROBS['mutation']) + \
+                    PROBS['mutation'] * (1 - PROBS['mutation'])
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = PROBS['mutation'] * 0.5 + \
+                    (1 - PROBS['mutation']) * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = PROBS['mutation'] * PROBS['mutation'] + \
+                    (1 - PROBS['mutation']) * (1 - PROBS['mutation'])
+        elif father in one_gene:
+            # Father - One gene
+            if mother in zero_gene:
+                # Mother - Zero gene
+                join_prob = 0.5 * \
+                    (1 - PROBS['mutation']) + 0.5 * PROBS['mutation']
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = 0.5 * 0.5 + 0.5 * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = 0.5 * \
+                    (1 - PROBS['mutation']) + 0.5 * PROBS['mutation']
+        elif father in two_genes:
+            # Father - 2 gene
+            if mother in zero_gene:
+                # Mother - 0 gene
+                join_prob = (1 - PROBS['mutation']) * (1 - PROBS['mutation']
+                                                       ) + PROBS['mutation'] * PROBS['mutation']
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = (1 - PROBS['mutation']) * \
+                    0.5 + (PROBS['mutation']) * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = (1 - PROBS['mutation']) * PROBS['mutation'] + \
+                    (1 - PROBS['mutation']) * PROBS['mutation']
+    else:
+        # Possible ways child can get 2 genes
+        if father in zero_gene:
+            # Father - One gene
+            if mother in zero_gene:
+                # Mother - Zero gene
+                join_prob = PROBS['mutation'] * PROBS['mutation']
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = PROBS['mutation'] * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = PROBS['mutation'] * (1 - PROBS['mutation'])
+        elif father in one_gene:
+            # Father - One gene
+            if mother in zero_gene:
+                # Mother - Zero gene
+                join_prob = 0.5 * PROBS['mutation']
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = 0.5 * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = 0.5 * (1 - PROBS['mutation'])
+        elif father in two_genes:
+            # Father - 2 gene
+            if mother in zero_gene:
+                # Mother - 0 gene
+                join_prob = (1 - PROBS['mutation']) * PROBS['mutation']
+            elif mother in one_gene:
+                # Mother - 1 gene
+                join_prob = (1 - PROBS['mutation']) * 0.5
+            else:
+                # Mother - 2 genes
+                join_prob = (1 - PROBS['mutation']) * (1 - PROBS['mutation'])
+    return join_prob
+
+
+if __name__ == "__main__":
+    main()
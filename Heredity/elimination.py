@@ -0,0 +1,289 @@
+import heapq
+import itertools
+
+# Number of copies of the gene a person can have
+GENES = (0, 1, 2)
+
+
+class Factor():
+
+    def __init__(self, variables, values):
+        """
+        Create a factor over the people in the tuple `variables`, where
+        `values` maps each tuple of their gene counts to a number.
+        """
+        self.variables = variables
+        self.values = values
+
+    def multiply(self, other):
+        """
+        Return the product of this factor and `other`.
+        """
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables)
+        own = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+        values = {}
+        for genes in itertools.product(GENES, repeat=len(variables)):
+            values[genes] = self.values[tuple(genes[i] for i in own)] * \
+                other.values[tuple(genes[i] for i in theirs)]
+        return Factor(variables, values)
+
+    def marginalize(self, keep):
+        """
+        Return this factor summed over every person not in `keep`.
+        """
+        variables = tuple(v for v in self.variables if v in keep)
+        kept = [self.variables.index(v) for v in variables]
+        values = dict.fromkeys(
+            itertools.product(GENES, repeat=len(variables)), 0)
+        for genes, value in self.values.items():
+            values[tuple(genes[i] for i in kept)] += value
+        return Factor(variables, values)
+
+
+class JunctionTree():
+
+    def __init__(self, structure, probs):
+        """
+        Compile the junction tree of a pedigree with the given
+        `structure`, as returned by `pedigree_structure`, from the
+        `probs` tables.
+
+        People are eliminated in a min-fill order, each leaving a clique
+        of the people linked to them, and the tree holds the clique
+        potentials before any trait is known, so families with the same
+        structure can share it.
+        """
+        self.structure = structure
+        self.probs = probs
+        factors = [person_factor(structure, person, probs)
+                   for person in range(len(structure))]
+        self.order, self.cliques = elimination_order(factors)
+        position = {person: i for i, person in enumerate(self.order)}
+
+        # Each clique hands its message to the clique of the first person
+        # eliminated after its own among the people it shares
+        self.parent = {}
+        for person in self.order:
+            rest = [v for v in self.cliques[person] if v != person]
+            if rest:
+                self.parent[person] = min(rest, key=position.get)
+        self.children = {person: [] for person in self.order}
+        for child in self.parent:
+            self.children[self.parent[child]].append(child)
+
+        # Give each factor to the clique of its first eliminated person,
+        # where the person's trait is later added too
+        self.potentials = {
+            person: Factor((person,), {(g,): 1 for g in GENES})
+            for person in self.order
+        }
+        self.home = {}
+        for person, factor in enumerate(factors):
+            first = min(factor.variables, key=position.get)
+            self.home[person] = first
+            self.potentials[first] = self.potentials[first].multiply(factor)
+        for person in self.order:
+            self.potentials[person] = expand(self.potentials[person],
+                                             self.cliques[person])
+
+    def marginals(self, people):
+        """
+        Return the gene and trait distribution of each person given the
+        known traits of `people`, a family with this tree's structure.
+        """
+        names = list(people)
+        potentials = dict(self.potentials)
+        for person, name in enumerate(names):
+            observed = people[name]["trait"]
+            if observed is not None:
+                home = self.home[person]
+                potentials[home] = potentials[home].multiply(Factor(
+                    (person,),
+                    {(g,): self.probs["trait"][g][observed] for g in GENES}
+                ))
+
+        # Collect evidence from the leaves up, in elimination order
+        upward = {}
+        for person in self.order:
+            belief = potentials[person]
+            for child in self.children[person]:
+                belief = belief.multiply(upward[child])
+            if person in self.parent:
+                upward[person] = belief.marginalize(
+                    set(self.cliques[person]) - {person})
+
+        # Then distribute it back down from the roots
+        downward = {}
+        beliefs = {}
+        for person in reversed(self.order):
+            belief = potentials[person]
+            if person in downward:
+                belief = belief.multiply(downward[person])
+            for child in self.children[person]:
+                message = belief
+                for other in self.children[person]:
+                    if other != child:
+                        message = message.multiply(upward[other])
+                downward[child] = message.marginalize(
+                    set(self.cliques[child]) - {child})
+            for child in self.children[person]:
+                belief = belief.multiply(upward[child])
+            beliefs[person] = belief
+
+        probabilities = {}
+        for person, name in enumerate(names):
+            gene = beliefs[person].marginalize({person}).values
+            total = sum(gene.values())
+            gene = {g: gene[(g,)] / total for g in (2, 1, 0)}
+            observed = people[name]["trait"]
+            if observed is None:
+                trait = {
+                    value: sum(gene[g] * self.probs["trait"][g][value]
+                               for g in GENES)
+                    for value in (True, False)
+                }
+            else:
+                trait = {True: float(observed), False: float(not observed)}
+            probabilities[name] = {"gene": gene, "trait": trait}
+        return probabilities
+
+
+def marginals(people, probs):
+    """
+    Return the gene and trait distribution of each person given the
+    known traits, computed exactly from the `probs` tables.
+
+    The pedigree is turned into a junction tree and messages are passed
+    up and back down it once, so the cost grows linearly with the
+    number of people for families whose pedigree has no loops.
+    """
+    return JunctionTree(pedigree_structure(people), probs).marginals(people)
+
+
+def pedigree_structure(people):
+    """
+    Return the shape of the family `people` without names or traits:
+    for each person in order, the positions of their mother and father,
+    or None for someone whose parents are unknown. Raises an exception
+    if only one parent is given or a parent is not in the family.
+    """
+    index = {name: i for i, name in enumerate(people)}
+    structure = []
+    for name in people:
+        mother, father = people[name]["mother"], people[name]["father"]
+        if not mother and not father:
+            structure.append(None)
+            continue
+        if not mother or not father:
+            known, missing = ("mother", "father") if mother else \
+                ("father", "mother")
+            raise Exception(f"'{name}' has a {known} but no {missing}")
+        for role, parent in (("mother", mother), ("father", father)):
+            if parent not in index:
+                raise Exception(f"unknown {role} '{parent}' of '{name}'")
+        structure.append((index[mother], index[father]))
+    return tuple(structure)
+
+
+def person_factor(structure, person, probs):
+    """
+    Return the factor over `person` and their parents in `structure`
+    giving the probability of the person's gene count given their
+    parents'.
+    """
+    if structure[person] is None:
+        return Factor((person,), {(g,): probs["gene"][g] for g in GENES})
+    mother, father = structure[person]
+    return Factor((person, mother, father), {
+        (g, m, f): inheritance(g, m, f, probs["mutation"])
+        for g, m, f in itertools.product(GENES, repeat=3)
+    })
+
+
+def inheritance(child, mother, father, mutation):
+    """
+    Return the probability that a child has `child` copies of the gene
+    given their parents' copies.
+    """
+    from_mother = passes_gene(mother, mutation)
+    from_father = passes_gene(father, mutation)
+    if child == 0:
+        return (1 - from_mother) * (1 - from_father)
+    if child == 1:
+        return from_mother * (1 - from_father) + \
+            (1 - from_mother) * from_father
+    return from_mother * from_father
+
+
+def passes_gene(genes, mutation):
+    """
+    Return the probability that a parent with `genes` copies of the
+    gene passes one on.
+    """
+    if genes == 0:
+        return mutation
+    if genes == 1:
+        return 0.5
+    return 1 - mutation
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate people, each time choosing
+    the person whose elimination links the fewest unlinked people, and
+    the clique of people linked to each person when eliminated.
+    """
+    neighbours = {}
+    for factor in factors:
+        for person in factor.variables:
+            neighbours.setdefault(person, set()).update(factor.variables)
+    for person in neighbours:
+        neighbours[person].discard(person)
+
+    def fill(person):
+        linked = list(neighbours[person])
+        return sum(1 for a, b in itertools.combinations(linked, 2)
+                   if b not in neighbours[a])
+
+    def key(person):
+        return (fill(person), len(neighbours[person]), str(person))
+
+    # Only the people linked to the one eliminated change their fill,
+    # so the others keep their place in the heap and stale entries are
+    # skipped when popped
+    keys = {person: key(person) for person in neighbours}
+    heap = [keys[person] + (person,) for person in neighbours]
+    heapq.heapify(heap)
+    order = []
+    cliques = {}
+    while heap:
+        *score, person = heapq.heappop(heap)
+        if person not in keys or tuple(score) != keys[person]:
+            continue
+        del keys[person]
+        linked = neighbours.pop(person)
+        cliques[person] = (person,) + tuple(sorted(linked, key=str))
+        for a, b in itertools.combinations(linked, 2):
+            neighbours[a].add(b)
+            neighbours[b].add(a)
+        for other in linked:
+            neighbours[other].discard(person)
+        for other in set(linked).union(*(neighbours[v] for v in linked)):
+            keys[other] = key(other)
+            heapq.heappush(heap, keys[other] + (other,))
+        order.append(person)
+    return order, cliques
+
+
+def expand(factor, variables):
+    """
+    Return `factor` over the people in `variables`, constant in those
+    it did not depend on.
+    """
+    missing = tuple(v for v in variables if v not in factor.variables)
+    if not missing:
+        return factor
+    return factor.multiply(Factor(missing, dict.fromkeys(
+        itertools.product(GENES, repeat=len(missing)), 1)))
@@ -1,7 +1,11 @@
+import argparse
 import csv
 import itertools
+import os
 import sys
 
+from elimination import GENES, inheritance, marginals
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,14 +40,88 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Probability of a child's copies of the gene given their mother's and
+# father's, indexed [child][mother][father], derived once from PROBS as
+# nested lists, which are quick to index one at a time
+INHERITANCE = [
+    [[inheritance(child, mother, father, PROBS["mutation"])
+      for father in GENES] for mother in GENES]
+    for child in GENES
+]
+
+# Inference engines selectable for main, each returning the gene and
+# trait distribution of every person
+ENGINES = {
+    "elimination": lambda people: marginals(people, PROBS),
+    "enumeration": lambda people: enumerate_probabilities(people),
+    "vectorized": lambda people: vectorized_engine(people)
+}
+
+# Sampling engines selectable for main, the keys of sampling.SAMPLERS,
+# which like the vectorized engine need NumPy
+SAMPLING_ENGINES = ["likelihood", "gibbs"]
+
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Probability of carrying the GJB2 gene")
+    parser.add_argument("data", help="CSV file of the family")
+    parser.add_argument("--engine", choices=list(ENGINES) + SAMPLING_ENGINES,
+                        default="elimination",
+                        help="inference used, exact or sampled "
+                             "(default: elimination)")
+    parser.add_argument("--samples", type=int,
+                        help="samples drawn by a sampling engine "
+                             "(default: SAMPLES in sampling.py)")
+    parser.add_argument("--seed", type=int,
+                        help="seed of a sampling engine")
+    parser.add_argument("--chains", type=int, default=os.cpu_count(),
+                        help="independent chains of a sampling engine")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="processes the chains are run in")
+    args = parser.parse_args()
+    people = load_data(args.data)
+
+    # Sampling engines also give the standard error of each probability
+    errors = None
+    if args.engine in SAMPLING_ENGINES:
+        from sampling import MIN_EFFECTIVE, SAMPLES, sample_probabilities
+        samples = SAMPLES if args.samples is None else args.samples
+        probabilities, errors, effective = sample_probabilities(
+            people, PROBS, args.engine, samples, args.seed,
+            args.chains, min(args.processes, args.chains))
+        if effective is not None and effective < MIN_EFFECTIVE:
+            print(f"Warning: only {effective:.0f} effective samples, so the "
+                  "standard errors may be unreliable", file=sys.stderr)
+    else:
+        probabilities = ENGINES[args.engine](people)
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    error = errors[person][field][value]
+                    print(f"    {value}: {p:.4f} ± {error:.4f}")
 
+
+def enumerate_probabilities(people):
+    """
+    Return the gene and trait distribution of every person by summing
+    the probability of every assignment of genes together with the
+    known traits.
+
+    Assignments are generated one at a time, so memory use does not
+    grow with the size of the family, and unknown traits are summed
+    out from each person's genes rather than enumerated. This still
+    takes time exponential in the number of people, so it only serves
+    small families and as a reference for the other engines.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -60,37 +138,64 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    for one_gene, two_genes in gene_assignments(list(people)):
+        p = evidence_probability(people, one_gene, two_genes)
+        for person in people:
+            genes = (2 if person in two_genes else
+                     1 if person in one_gene else 0)
+            probabilities[person]["gene"][genes] += p
+            trait = people[person]["trait"]
+            if trait is None:
+                for value in (True, False):
+                    probabilities[person]["trait"][value] += \
+                        p * PROBS["trait"][genes][value]
+            else:
+                probabilities[person]["trait"][trait] += p
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def gene_assignments(names):
+    """
+    Yield every way to split `names` into the sets of people with one
+    and two copies of the gene, as (one_gene, two_genes) pairs.
+    """
+    for genes in itertools.product((0, 1, 2), repeat=len(names)):
+        yield (
+            {name for name, copies in zip(names, genes) if copies == 1},
+            {name for name, copies in zip(names, genes) if copies == 2}
         )
-        if fails_evidence:
-            continue
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+def evidence_probability(people, one_gene, two_genes):
+    """
+    Return the probability that everyone in `one_gene` has one copy of
+    the gene, everyone in `two_genes` has two, everyone else has none,
+    and everyone whose trait is known has it as recorded.
+    """
+    probability = 1
+    zero_gene = set(people) - one_gene - two_genes
+    for name in people:
+        genes = 2 if name in two_genes else 1 if name in one_gene else 0
+        if people[name]["mother"]:
+            probability *= calculate(people, name, zero_gene, one_gene,
+                                     two_genes, genes)
+        else:
+            probability *= PROBS["gene"][genes]
+        if people[name]["trait"] is not None:
+            probability *= PROBS["trait"][genes][people[name]["trait"]]
+    return probability
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+
+def vectorized_engine(people):
+    """
+    Return the gene and trait distribution of every person from
+    vectorized.py, imported only when used since it needs NumPy.
+    """
+    from vectorized import vectorized_probabilities
+    return vectorized_probabilities(people, PROBS)
 
 
 def load_data(filename):
@@ -175,123 +280,15 @@ def joint_probability(people, one_gene, two_genes, have_trait):
 
 
 def calculate(people, name, zero_gene, one_gene, two_genes, in_gene):
-    join_prob = 1
-    father = people[name]['father']
-    mother = people[name]['mother']
-    if in_gene == 0:
-        # Possible ways child can get 0 genes
-        if father in zero_gene:
-            # Father - Zero gene
-            if mother in zero_gene:
-                # Mother - Zero gene
-                join_prob = (1 - PROBS['mutation']) * (1 - PROBS['mutation'])
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = (1 - PROBS['mutation']) * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = (1 - PROBS['mutation']) * PROBS['mutation']
-        elif father in one_gene:
-            # Father - One gene
-            if mother in zero_gene:
-                # Mother - Zero gene
-                join_prob = 0.5 * (1 - PROBS['mutation'])
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = 0.5 * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = 0.5 * PROBS['mutation']
-        elif father in two_genes:
-            # Father - 2 gene
-            if mother in zero_gene:
-                # Mother - 0 gene
-                join_prob = PROBS['mutation'] * (1 - PROBS['mutation'])
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = PROBS['mutation'] * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = PROBS['mutation'] * PROBS['mutation']
-    elif in_gene == 1:
-        # Possible ways child can get 1 genes
-        if father in zero_gene:
-            # Father - Zero gene
-            if mother in zero_gene:
-                # Mother - Zero gene
-                join_prob = PROBS['mutation'] * (1 - PROBS['mutation']) + \
-                    PROBS['mutation'] * (1 - PROBS['mutation'])
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = PROBS['mutation'] * 0.5 + \
-                    (1 - PROBS['mutation']) * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = PROBS['mutation'] * PROBS['mutation'] + \
-                    (1 - PROBS['mutation']) * (1 - PROBS['mutation'])
-        elif father in one_gene:
-            # Father - One gene
-            if mother in zero_gene:
-                # Mother - Zero gene
-                join_prob = 0.5 * \
-                    (1 - PROBS['mutation']) + 0.5 * PROBS['mutation']
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = 0.5 * 0.5 + 0.5 * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = 0.5 * \
-                    (1 - PROBS['mutation']) + 0.5 * PROBS['mutation']
-        elif father in two_genes:
-            # Father - 2 gene
-            if mother in zero_gene:
-                # Mother - 0 gene
-                join_prob = (1 - PROBS['mutation']) * (1 - PROBS['mutation']
-                                                       ) + PROBS['mutation'] * PROBS['mutation']
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = (1 - PROBS['mutation']) * \
-                    0.5 + (PROBS['mutation']) * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = (1 - PROBS['mutation']) * PROBS['mutation'] + \
-                    (1 - PROBS['mutation']) * PROBS['mutation']
-    else:
-        # Possible ways child can get 2 genes
-        if father in zero_gene:
-            # Father - One gene
-            if mother in zero_gene:
-                # Mother - Zero gene
-                join_prob = PROBS['mutation'] * PROBS['mutation']
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = PROBS['mutation'] * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = PROBS['mutation'] * (1 - PROBS['mutation'])
-        elif father in one_gene:
-            # Father - One gene
-            if mother in zero_gene:
-                # Mother - Zero gene
-                join_prob = 0.5 * PROBS['mutation']
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = 0.5 * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = 0.5 * (1 - PROBS['mutation'])
-        elif father in two_genes:
-            # Father - 2 gene
-            if mother in zero_gene:
-                # Mother - 0 gene
-                join_prob = (1 - PROBS['mutation']) * PROBS['mutation']
-            elif mother in one_gene:
-                # Mother - 1 gene
-                join_prob = (1 - PROBS['mutation']) * 0.5
-            else:
-                # Mother - 2 genes
-                join_prob = (1 - PROBS['mutation']) * (1 - PROBS['mutation'])
-    return join_prob
+    """
+    Return the probability that `name` has `in_gene` copies of the gene
+    given how many copies each of their parents has.
+    """
+    mother = people[name]["mother"]
+    father = people[name]["father"]
+    return INHERITANCE[in_gene][
+        0 if mother in zero_gene else 1 if mother in one_gene else 2][
+        0 if father in zero_gene else 1 if father in one_gene else 2]
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -0,0 +1,252 @@
+from multiprocessing import Pool
+
+import numpy as np
+
+from vectorized import probability_tables
+
+# Samples drawn in total across the chains by default
+SAMPLES = 100000
+
+# Gibbs walkers advanced together in each chain, and the sweeps each
+# one makes before its samples are counted
+WALKERS = 100
+BURN_IN = 50
+
+# Batches each likelihood weighting chain's samples are split into; the
+# spread of the batch estimates gives the standard errors
+BATCHES = 20
+
+# Effective samples below which the weights are too uneven for the
+# standard errors to be trusted
+MIN_EFFECTIVE = 1000
+
+
+def sample_probabilities(people, probs, sampler, samples=SAMPLES, seed=None,
+                         chains=1, processes=1):
+    """
+    Estimate the gene and trait distribution of every person from
+    `samples` samples drawn by `sampler`, one of SAMPLERS, split over
+    `chains` independent chains run by `processes` processes.
+
+    Returns the probabilities, in the same form as the exact engines,
+    the standard error of each of them, and the number of effective
+    samples, which falls far below `samples` when a few samples carry
+    most of the weight. Gibbs samples are unweighted but correlated, so
+    their number of effective samples is None.
+    """
+    names = list(people)
+    if samples < chains * BATCHES:
+        raise Exception(f"At least {chains * BATCHES} samples are needed "
+                        f"for {chains} chains")
+    jobs = [
+        (sampler, people, probs, samples // chains, sequence)
+        for sequence in np.random.SeedSequence(seed).spawn(chains)
+    ]
+    if processes > 1:
+        with Pool(processes) as pool:
+            results = pool.map(run_chain, jobs)
+    else:
+        results = list(map(run_chain, jobs))
+
+    # Sums of each person's probability of 0, 1 and 2 copies of the gene
+    # and of having the trait, and of the weights, for every batch
+    sums = np.concatenate([sums for sums, _, _ in results])
+    weights = np.concatenate([weights for _, weights, _ in results])
+    squares = [squares for _, _, squares in results]
+    effective = None if None in squares else weights.sum() ** 2 / sum(squares)
+    estimates = sums.sum(axis=0) / weights.sum()
+    batches = sums / weights[:, None, None]
+    errors = batches.std(axis=0, ddof=1) / np.sqrt(len(batches))
+
+    probabilities = {}
+    standard_errors = {}
+    for i, name in enumerate(names):
+        observed = people[name]["trait"]
+        if observed is None:
+            has_trait = float(estimates[i, 3])
+            trait_error = float(errors[i, 3])
+        else:
+            has_trait = float(observed)
+            trait_error = 0.0
+        probabilities[name] = {
+            "gene": {g: float(estimates[i, g]) for g in (2, 1, 0)},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+        standard_errors[name] = {
+            "gene": {g: float(errors[i, g]) for g in (2, 1, 0)},
+            "trait": {True: trait_error, False: trait_error}
+        }
+    return probabilities, standard_errors, effective
+
+
+def run_chain(job):
+    """
+    Run one chain of a sampler in SAMPLERS for sample_probabilities.
+    """
+    sampler, people, probs, samples, sequence = job
+    return SAMPLERS[sampler](people, probability_tables(probs), samples,
+                             np.random.default_rng(sequence))
+
+
+def likelihood_weighting(people, tables, samples, rng):
+    """
+    Draw `samples` assignments of genes from parents to children,
+    weighting each by the probability of the known traits given it.
+
+    Returns the weighted sums, for each of BATCHES batches, of each
+    person's probability of having 0, 1 and 2 copies of the gene and of
+    having the trait, as an array indexed [batch, person, value], the
+    sum of the weights of each batch and the sum of their squares.
+    """
+    gene, trait, inherit = tables
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    sums = np.zeros((BATCHES, len(names), 4))
+    weights = np.zeros(BATCHES)
+    squares = 0
+
+    for batch, size in enumerate(batch_sizes(samples)):
+        genes = np.zeros((size, len(names)), dtype=np.intp)
+        weight = np.ones(size)
+        for name in ancestral_order(people):
+            i = index[name]
+            mother = people[name]["mother"]
+            if mother:
+                distribution = inherit[:, genes[:, index[mother]],
+                                       genes[:, index[people[name]["father"]]]
+                                       ].T
+            else:
+                distribution = np.broadcast_to(gene, (size, 3))
+            genes[:, i] = choose(distribution, rng)
+            if people[name]["trait"] is not None:
+                weight *= trait[genes[:, i], int(people[name]["trait"])]
+
+        for i in range(len(names)):
+            sums[batch, i, :3] = np.bincount(genes[:, i], weights=weight,
+                                             minlength=3)
+            sums[batch, i, 3] = weight @ trait[genes[:, i], 1]
+        weights[batch] = weight.sum()
+        squares += weight @ weight
+    return sums, weights, squares
+
+
+def gibbs(people, tables, samples, rng):
+    """
+    Run WALKERS Gibbs samplers side by side, each redrawing every
+    person's genes in turn from their distribution given everyone
+    else's genes and the known traits, until they have drawn `samples`
+    samples between them after BURN_IN sweeps each.
+
+    Each sweep counts the distribution every person's genes were drawn
+    from rather than the genes drawn, which gives the same estimates
+    with less noise. Returns the sums and weights of each walker, as for
+    the batches of `likelihood_weighting`, with every sample weighing
+    one, and None for the sum of the squared weights, since successive
+    sweeps are not independent samples.
+    """
+    gene, trait, inherit = tables
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    children = {name: [] for name in names}
+    for name in names:
+        if people[name]["mother"]:
+            children[people[name]["mother"]].append((name, "mother"))
+            children[people[name]["father"]].append((name, "father"))
+
+    # Start from genes drawn from parents to children, which all have
+    # some chance of explaining the evidence
+    genes = np.zeros((WALKERS, len(names)), dtype=np.intp)
+    for name in ancestral_order(people):
+        mother = people[name]["mother"]
+        if mother:
+            distribution = inherit[:, genes[:, index[mother]],
+                                   genes[:, index[people[name]["father"]]]].T
+        else:
+            distribution = np.broadcast_to(gene, (WALKERS, 3))
+        genes[:, index[name]] = choose(distribution, rng)
+
+    # Walkers are independent, so each one is a batch of its own rather
+    # than a stretch of sweeps, whose samples would be correlated; this
+    # gives the standard errors far more batches to be estimated from
+    sums = np.zeros((WALKERS, len(names), 4))
+    sweeps = -(-samples // WALKERS)
+    for sweep in range(BURN_IN + sweeps):
+        for name in names:
+            i = index[name]
+            mother = people[name]["mother"]
+            if mother:
+                distribution = inherit[
+                    :, genes[:, index[mother]],
+                    genes[:, index[people[name]["father"]]]].T
+            else:
+                distribution = np.tile(gene, (WALKERS, 1))
+            if people[name]["trait"] is not None:
+                distribution = distribution * \
+                    trait[:, int(people[name]["trait"])]
+            for child, role in children[name]:
+                other = index[people[child]["father" if role == "mother"
+                                             else "mother"]]
+                if role == "mother":
+                    distribution = distribution * inherit[
+                        genes[:, index[child]], :, genes[:, other]]
+                else:
+                    distribution = distribution * inherit[
+                        genes[:, index[child]], genes[:, other], :]
+            distribution /= distribution.sum(axis=1, keepdims=True)
+            genes[:, i] = choose(distribution, rng)
+
+            if sweep >= BURN_IN:
+                sums[:, i, :3] += distribution
+                sums[:, i, 3] += distribution @ trait[:, 1]
+    weights = np.full(WALKERS, sweeps)
+    return sums, weights, None
+
+
+def choose(distribution, rng):
+    """
+    Return one gene count drawn from each row of `distribution`.
+    """
+    cumulative = distribution.cumsum(axis=1)
+    draws = rng.random(len(distribution)) * cumulative[:, -1]
+    return np.minimum((draws[:, None] >= cumulative).sum(axis=1), 2)
+
+
+def batch_sizes(samples):
+    """
+    Return the number of samples in each of BATCHES batches of
+    `samples`.
+    """
+    return [samples // BATCHES + (batch < samples % BATCHES)
+            for batch in range(BATCHES)]
+
+
+def ancestral_order(people):
+    """
+    Return the names of `people` ordered so that everyone comes after
+    their parents.
+    """
+    order = []
+    placed = set()
+    for name in people:
+        stack = [name]
+        while stack:
+            person = stack[-1]
+            if person in placed:
+                stack.pop()
+                continue
+            parents = [people[person][parent] for parent in
+                       ("mother", "father") if people[person][parent] and
+                       people[person][parent] not in placed]
+            if parents:
+                stack.extend(parents)
+            else:
+                stack.pop()
+                placed.add(person)
+                order.append(person)
+    return order
+
+
+SAMPLERS = {
+    "likelihood": likelihood_weighting,
+    "gibbs": gibbs
+}
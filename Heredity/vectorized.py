@@ -0,0 +1,109 @@
+import numpy as np
+
+from elimination import GENES, inheritance
+
+# Gene assignments scored together by vectorized_probabilities
+CHUNK = 1 << 16
+
+
+def inheritance_tensor(probs):
+    """
+    Return the 3x3x3 array whose [child, mother, father] entry is the
+    probability that a child has `child` copies of the gene given their
+    parents' copies, under the mutation rate in `probs`.
+    """
+    return np.array([
+        [[inheritance(child, mother, father, probs["mutation"])
+          for father in GENES] for mother in GENES]
+        for child in GENES
+    ])
+
+
+def probability_tables(probs):
+    """
+    Return the unconditional gene probabilities, the trait probabilities
+    indexed by [genes, trait] and the inheritance tensor of `probs` as
+    arrays.
+    """
+    gene = np.array([probs["gene"][g] for g in GENES])
+    trait = np.array([[probs["trait"][g][False], probs["trait"][g][True]]
+                      for g in GENES])
+    return gene, trait, inheritance_tensor(probs)
+
+
+def gene_probability(people, genes, tables):
+    """
+    Return the probability of each row of `genes`, an array with one
+    column of gene counts per person in the order of `people`.
+    """
+    gene, _, inherit = tables
+    index = {name: i for i, name in enumerate(people)}
+    probability = np.ones(len(genes))
+    for i, name in enumerate(people):
+        mother = people[name]["mother"]
+        father = people[name]["father"]
+        if mother:
+            probability *= inherit[genes[:, i], genes[:, index[mother]],
+                                   genes[:, index[father]]]
+        else:
+            probability *= gene[genes[:, i]]
+    return probability
+
+
+def joint_probability(people, genes, traits, tables):
+    """
+    Return the joint probability of each row of `genes` and `traits`,
+    arrays with one column per person in the order of `people` holding
+    their gene counts and whether they have the trait.
+
+    This scores many assignments at once, each the same as
+    heredity.joint_probability would for the matching sets of people.
+    """
+    _, trait, _ = tables
+    probability = gene_probability(people, genes, tables)
+    probability *= trait[genes, traits.astype(np.intp)].prod(axis=1)
+    return probability
+
+
+def vectorized_probabilities(people, probs, chunk=CHUNK):
+    """
+    Return the gene and trait distribution of every person by scoring
+    every assignment of genes, CHUNK at a time, together with the known
+    traits.
+
+    Like heredity.enumerate_probabilities this takes time exponential
+    in the number of people, but it does the work in array operations.
+    """
+    tables = probability_tables(probs)
+    _, trait, _ = tables
+    names = list(people)
+    n = len(names)
+    observed = [i for i, name in enumerate(names)
+                if people[name]["trait"] is not None]
+    values = np.array([people[names[i]]["trait"] for i in observed],
+                      dtype=np.intp)
+    powers = 3 ** np.arange(n)
+
+    totals = np.zeros((n, 3))
+    for start in range(0, 3 ** n, chunk):
+        assignments = np.arange(start, min(3 ** n, start + chunk))
+        genes = assignments[:, None] // powers % 3
+        probability = gene_probability(people, genes, tables)
+        if observed:
+            probability *= trait[genes[:, observed], values].prod(axis=1)
+        for i in range(n):
+            totals[i] += np.bincount(genes[:, i], weights=probability,
+                                     minlength=3)
+
+    probabilities = {}
+    for i, name in enumerate(names):
+        gene = totals[i] / totals[i].sum()
+        if people[name]["trait"] is None:
+            has_trait = float(gene @ trait[:, 1])
+        else:
+            has_trait = float(people[name]["trait"])
+        probabilities[name] = {
+            "gene": {g: float(gene[g]) for g in (2, 1, 0)},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from generate import generate
+from pagerank import DAMPING, SAMPLES, batched_sample_pagerank, crawl, \
+    iterate_pagerank, link_graph, matrix_pagerank, sample_pagerank, \
+    transition_model
+from solvers import SOLVERS
+
+try:
+    import resource
+except ImportError:
+    # Not on Windows, where the crawl's memory goes unreported
+    resource = None
+
+# The crawl and engines sections share one corpus, generated unless
+# one is given, while the dangling section builds its own
+SECTIONS = ["crawl", "engines", "dangling"]
+
+# Size of the corpus generated when none is given, and of the random
+# corpus for the dangling section, the share of its pages that have no
+# links, and the links on every other page
+PAGES = 2000
+DANGLING_FRACTION = 0.5
+LINKS_PER_PAGE = 8
+
+# Samples drawn by the batched sampler in the engines section
+BATCHED_SAMPLES = 1000000
+
+# Tolerance of the reference ranking the engines are compared with
+REFERENCE_TOLERANCE = 1e-12
+
+# Samples drawn by sample_pagerank in the dangling section, and by the
+# much slower sampler through transition_model it replaced
+DANGLING_SAMPLES = 20000
+TRANSITION_SAMPLES = 1000
+
+# Seconds an engine is run for, again and again, before its fastest run
+# is taken, since the matrix solvers finish in milliseconds
+MIN_SECONDS = 0.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PageRank")
+    parser.add_argument("corpus", nargs="?",
+                        help="corpus to crawl and rank (default: a "
+                             "generated one of --pages pages)")
+    parser.add_argument("--sections", default=",".join(SECTIONS),
+                        help="comma separated sections to run "
+                             f"(default: {','.join(SECTIONS)})")
+    parser.add_argument("--pages", type=int, default=PAGES,
+                        help="pages in generated corpora")
+    parser.add_argument("--dangling", type=float, default=DANGLING_FRACTION,
+                        help="share of pages without links in the dangling "
+                             "section's corpus")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="processes for the parallel crawl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    sections = args.sections.split(",")
+    for section in sections:
+        if section not in SECTIONS:
+            sys.exit(f"Unknown section '{section}'.")
+
+    with tempfile.TemporaryDirectory() as generated:
+        directory = args.corpus
+        if directory is None and ("crawl" in sections
+                                  or "engines" in sections):
+            directory = generated
+            links = generate(directory, args.pages, LINKS_PER_PAGE, 0.1,
+                             args.seed)
+            print(f"Generated {args.pages} pages with {links} links")
+            print()
+
+        results = {"corpus": args.corpus}
+        for section in sections:
+            if section == "crawl":
+                results["crawl"] = benchmark_crawl(directory, args.processes)
+            elif section == "engines":
+                results["engines"] = benchmark_engines(directory, args.seed)
+            else:
+                results["dangling"] = benchmark_dangling(
+                    args.pages, args.dangling, args.seed)
+            print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def benchmark_crawl(directory, processes):
+    """
+    Print and return the time taken to crawl `directory` in this
+    process and with a pool of `processes` workers, and the most memory
+    any of them held.
+    """
+    results = {}
+    print("Crawl          Pages    Seconds     Pages/s")
+    for name, count in [("serial", 1), ("parallel", processes)]:
+        report = {}
+        crawl(directory, count, report)
+        rate = report["pages"] / max(report["seconds"], 1e-9)
+        print(f"{name:<10} {report['pages']:9} {report['seconds']:9.2f}s "
+              f"{rate:11.0f}")
+        results[name] = {"processes": count, "seconds": report["seconds"],
+                         "pages_per_second": rate}
+
+    # The parallel crawl parses in worker processes, whose memory does
+    # not show up in this one's
+    if resource is not None:
+        usage = [("main", resource.RUSAGE_SELF)]
+        if processes > 1:
+            usage.append(("workers", resource.RUSAGE_CHILDREN))
+        for name, who in usage:
+            peak = resource.getrusage(who).ru_maxrss
+            results[f"{name}_peak_rss_kib"] = peak
+            print(f"Peak resident memory ({name}): {peak / 1024:.1f} MiB")
+    return results
+
+
+def benchmark_engines(directory, seed):
+    """
+    Print and return the time, peak memory and L1 error of every
+    sampler and iterative engine on the corpus in `directory`, compared
+    with a tightly converged ranking.
+    """
+    corpus = crawl(directory)
+    graph = link_graph(corpus)
+    reference = matrix_pagerank(graph, DAMPING, REFERENCE_TOLERANCE)
+
+    engines = [
+        (f"sample n={SAMPLES}", sample_pagerank, (corpus, DAMPING, SAMPLES)),
+        (f"batched n={BATCHED_SAMPLES}", batched_sample_pagerank,
+         (graph, DAMPING, BATCHED_SAMPLES, 1000, seed)),
+        ("iterate", iterate_pagerank, (corpus, DAMPING))
+    ] + [
+        (f"matrix {solver}", matrix_pagerank,
+         (graph, DAMPING, 1e-8, 1000, None, None, solver))
+        for solver in SOLVERS
+    ]
+
+    results = {}
+    print(f"{len(corpus)} pages")
+    print("Engine                    Seconds    Memory   L1 error")
+    for name, function, arguments in engines:
+        random.seed(seed)
+        seconds, size, ranks = measure(function, *arguments)
+        error = sum(abs(ranks.get(page, 0) - reference[page])
+                    for page in reference)
+        print(f"{name:<24} {seconds:8.3f}s {size / 2 ** 20:6.1f} MiB "
+              f"{error:10.2e}")
+        results[name] = {"seconds": seconds, "bytes": size, "error": error}
+    return results
+
+
+def benchmark_dangling(pages, fraction, seed):
+    """
+    Print and return the cost of ranking a random corpus where
+    `fraction` of the pages have no links, with dangling pages handled
+    implicitly and with them expanded into links to every page, the way
+    iterate_pagerank used to rewrite the corpus.
+    """
+    corpus = random_corpus(pages, fraction, seed)
+    expanded = {
+        page: set(links) if links else set(corpus)
+        for page, links in corpus.items()
+    }
+
+    results = {}
+    ranks = {}
+    print(f"{pages} pages, {fraction:.0%} without links")
+    print("Corpus       Links    Iterate   Memory    Samples/s")
+    for name, variant in [("implicit", corpus), ("expanded", expanded)]:
+        links = sum(len(variant[page]) for page in variant)
+        seconds, size, ranks[name] = measure(iterate_pagerank, variant,
+                                             DAMPING)
+        random.seed(seed)
+        start = time.perf_counter()
+        sample_pagerank(variant, DAMPING, DANGLING_SAMPLES)
+        rate = DANGLING_SAMPLES / (time.perf_counter() - start)
+        print(f"{name:<9} {links:8} {seconds:9.2f}s {size / 2 ** 20:6.1f} MiB "
+              f"{rate:11.0f}")
+        results[name] = {"links": links, "iterate": seconds, "bytes": size,
+                         "samples_per_second": rate}
+
+    # The sampler before it stopped building a distribution every step
+    random.seed(seed)
+    start = time.perf_counter()
+    transition_sample(corpus, DAMPING, TRANSITION_SAMPLES)
+    rate = TRANSITION_SAMPLES / (time.perf_counter() - start)
+    results["transition_model_samples_per_second"] = rate
+    print(f"Sampling through transition_model: {rate:.0f} samples/s")
+
+    difference = sum(abs(ranks["implicit"][page] - ranks["expanded"][page])
+                     for page in corpus)
+    print(f"L1 difference between the rankings: {difference:.2e}")
+    results["difference"] = difference
+    return results
+
+
+def random_corpus(pages, fraction, seed):
+    """
+    Return a corpus dictionary of `pages` pages where `fraction` of
+    them have no links and the rest link to LINKS_PER_PAGE others.
+    """
+    generator = random.Random(seed)
+    names = [f"{page}.html" for page in range(pages)]
+    corpus = {}
+    for name in names:
+        if generator.random() < fraction:
+            corpus[name] = set()
+        else:
+            corpus[name] = set(generator.sample(names, LINKS_PER_PAGE)) - {name}
+    return corpus
+
+
+def measure(function, *arguments):
+    """
+    Return the fastest wall time of `function(*arguments)` over runs
+    adding up to MIN_SECONDS, the peak memory it allocates in a last,
+    traced run, and the result of the first.
+    """
+    start = time.perf_counter()
+    result = function(*arguments)
+    times = [time.perf_counter() - start]
+    while sum(times) < MIN_SECONDS:
+        start = time.perf_counter()
+        function(*arguments)
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+
+    tracemalloc.start()
+    function(*arguments)
+    _, size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, size, result
+
+
+def transition_sample(corpus, damping_factor, n):
+    """
+    Sample `n` pages by drawing each from the full distribution
+    returned by transition_model, as sample_pagerank used to.
+    """
+    page = random.choice(list(corpus))
+    for _ in range(n - 1):
+        model = transition_model(corpus, page, damping_factor)
+        page = random.choices(list(model), weights=list(model.values()))[0]
+
+
+if __name__ == "__main__":
+    main()
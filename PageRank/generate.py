@@ -0,0 +1,99 @@
+import argparse
+import os
+import random
+
+# Page written for each synthetic page, in the style of corpus0-2
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{name}</title>
+    </head>
+    <body>
+        <h1>{name}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}
+        </ul>
+    </body>
+</html>
+"""
+LINK = """            <li><a href="{page}">{name}</a></li>"""
+
+# Probability that a link goes to a uniformly chosen page rather than
+# in proportion to the links it already has, which sets how heavy the
+# tail of incoming links is
+UNIFORM_CHOICE = 0.3
+
+# Shape of the Pareto distribution of links per page; smaller is heavier
+OUTDEGREE_SHAPE = 1.5
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic PageRank corpus")
+    parser.add_argument("directory")
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--links", type=float, default=8,
+                        help="mean links per page that has any")
+    parser.add_argument("--dangling", type=float, default=0.1,
+                        help="share of pages without links")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    links = generate(args.directory, args.pages, args.links, args.dangling,
+                     args.seed)
+    print(f"Wrote {args.pages} pages with {links} links to {args.directory}")
+
+
+def generate(directory, pages, links, dangling, seed=0):
+    """
+    Write `pages` HTML pages to `directory` and return how many links
+    they hold.
+
+    A `dangling` share of pages have no links. The others have a
+    Pareto distributed number of links averaging `links`, and each link
+    goes to a page chosen by preferential attachment, so links into
+    pages follow a power law with a few very popular pages.
+    """
+    random.seed(seed)
+    os.makedirs(directory, exist_ok=True)
+    names = [page_name(page) for page in range(pages)]
+
+    # Every link target so far, so that a uniform pick from it chooses
+    # pages in proportion to their incoming links
+    targets = []
+    total = 0
+    scale = links * (OUTDEGREE_SHAPE - 1) / OUTDEGREE_SHAPE
+    for page in range(pages):
+        outlinks = set()
+        if random.random() >= dangling:
+            count = min(pages - 1, round(scale * random.paretovariate(
+                OUTDEGREE_SHAPE)))
+            while len(outlinks) < count:
+                if not targets or random.random() < UNIFORM_CHOICE:
+                    target = random.randrange(pages)
+                else:
+                    target = random.choice(targets)
+                if target != page:
+                    outlinks.add(target)
+            targets.extend(outlinks)
+            total += len(outlinks)
+
+        with open(os.path.join(directory, f"{names[page]}.html"), "w") as f:
+            f.write(PAGE.format(name=names[page], links="\n".join(
+                LINK.format(page=f"{names[target]}.html", name=names[target])
+                for target in sorted(outlinks)
+            )))
+    return total
+
+
+def page_name(page):
+    """
+    Return the name of synthetic page `page`, without its extension.
+    """
+    return f"page{page}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import os
+
+import numpy as np
+
+from linkgraph import page_files
+from pagerank import (DAMPING, MAX_ITERATIONS, TOLERANCE, corpus_links,
+                      matrix_pagerank, parse_pages)
+
+# Ranks and links of the last run, written to the corpus directory
+STATE_NAME = "ranks.npz"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="PageRank, reusing the ranks of the last run")
+    parser.add_argument("corpus")
+    parser.add_argument("--state",
+                        help=f"state file (default: corpus/{STATE_NAME})")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="processes used to parse changed pages")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--max-iterations", type=int, default=MAX_ITERATIONS)
+    args = parser.parse_args()
+
+    path = args.state or os.path.join(args.corpus, STATE_NAME)
+    state = RankState.load(path)
+    report = {}
+    state, changes = update(args.corpus, state, DAMPING, args.processes,
+                            args.tolerance, args.max_iterations, report)
+    state.save(path)
+
+    print(f"{len(changes['added'])} added, {len(changes['edited'])} edited, "
+          f"{len(changes['removed'])} removed; "
+          f"converged in {report['iterations']} sweeps")
+    print(f"PageRank Results from Iteration")
+    for page in sorted(state.ranks):
+        print(f"  {page}: {state.ranks[page]:.4f}")
+
+
+class RankState():
+
+    def __init__(self, files, links, ranks):
+        """
+        Create the state of a run from `files`, mapping each page to
+        the (size, mtime) it was parsed at, `links`, mapping each page
+        to every link in it before links out of the corpus are dropped,
+        and `ranks`, mapping each page to its PageRank.
+        """
+        self.files = files
+        self.links = links
+        self.ranks = ranks
+
+    @classmethod
+    def load(cls, path):
+        """
+        Return the state saved at `path`, or None if there is none.
+        """
+        try:
+            data = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        with data:
+            names = data["names"].tolist()
+            pages = names[:len(data["ranks"])]
+            offsets = data["offsets"]
+            links = data["links"]
+            files = dict(zip(pages, zip(data["sizes"].tolist(),
+                                        data["mtimes"].tolist())))
+            ranks = dict(zip(pages, data["ranks"].tolist()))
+            page_links = {
+                page: set(names[link] for link in
+                          links[offsets[i]:offsets[i + 1]].tolist())
+                for i, page in enumerate(pages)
+            }
+        return cls(files, page_links, ranks)
+
+    def save(self, path):
+        """
+        Write the state to `path`, with link targets stored as indices
+        into one table of names.
+        """
+        pages = sorted(self.files)
+        names = list(pages)
+        index = {name: i for i, name in enumerate(names)}
+        offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        links = []
+        for i, page in enumerate(pages):
+            for link in self.links[page]:
+                if link not in index:
+                    index[link] = len(names)
+                    names.append(link)
+                links.append(index[link])
+            offsets[i + 1] = len(links)
+
+        # Written through a file object so np.savez keeps the .tmp name
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                names=np.array(names, dtype=str),
+                sizes=np.array([self.files[page][0] for page in pages],
+                               dtype=np.int64),
+                mtimes=np.array([self.files[page][1] for page in pages],
+                                dtype=np.int64),
+                offsets=offsets,
+                links=np.array(links, dtype=np.int32),
+                ranks=np.array([self.ranks[page] for page in pages])
+            )
+        os.replace(f"{path}.tmp", path)
+
+
+def update(directory, state, damping_factor, processes=1,
+           tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, report=None):
+    """
+    Bring `state` up to date with the pages in `directory`.
+
+    Only pages added or edited since `state` was saved are parsed, and
+    the iteration starts from the previous ranks, so a few edits take a
+    few sweeps. `state` may be None for a first run.
+
+    Returns the new state and a dictionary listing the "added",
+    "edited" and "removed" pages.
+    """
+    files = page_files(directory)
+
+    previous = state.files if state else {}
+    changed = [
+        filename for filename in files
+        if previous.get(filename) != files[filename]
+    ]
+    links = {
+        filename: state.links[filename] for filename in files
+        if previous.get(filename) == files[filename]
+    }
+    links.update(parse_pages(directory, changed, processes))
+    changes = {
+        "added": sorted(f for f in changed if f not in previous),
+        "edited": sorted(f for f in changed if f in previous),
+        "removed": sorted(f for f in previous if f not in files)
+    }
+
+    ranks = matrix_pagerank(corpus_links(links), damping_factor, tolerance,
+                            max_iterations, state.ranks if state else None,
+                            report)
+    return RankState(files, links, ranks), changes
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+from bisect import bisect_left
+
+import numpy as np
+from scipy import sparse
+
+# Link graph saved in the corpus directory after the first crawl
+GRAPH_NAME = "linkgraph"
+GRAPH_VERSION = 1
+GRAPH_ARRAYS = ["names", "name_offsets", "offsets", "links"]
+
+
+class PageTable():
+
+    def __init__(self, names, offsets):
+        """
+        Create a table of sorted page names stored as one array of UTF-8
+        bytes, where name `i` is
+            names[offsets[i]:offsets[i + 1]]
+        """
+        self.names = names
+        self.offsets = offsets
+
+    @classmethod
+    def from_names(cls, pages):
+        """
+        Build a table from a sorted list of page names.
+        """
+        encoded = [page.encode("utf-8") for page in pages]
+        offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=offsets[1:])
+        names = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(names, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.names[self.offsets[i]:self.offsets[i + 1]] \
+            .tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self.names.tobytes()
+        offsets = self.offsets.tolist()
+        for i in range(len(self)):
+            yield data[offsets[i]:offsets[i + 1]].decode("utf-8")
+
+
+class LinkGraph():
+
+    def __init__(self, pages, offsets, links):
+        """
+        Create a link graph over `pages`, a sorted list of page names.
+
+        Pages are numbered by their position in `pages`, and outgoing
+        links are stored in CSR form, so page `i` links to the pages
+            links[offsets[i]:offsets[i + 1]]
+        """
+        self.pages = pages
+        self.offsets = offsets
+        self.links = links
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a link graph from a `crawl` corpus dictionary.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        links = []
+        for i, page in enumerate(pages):
+            targets = sorted(index[link] for link in corpus[page])
+            links.extend(targets)
+            offsets[i + 1] = offsets[i] + len(targets)
+        return cls(pages, offsets, np.array(links, dtype=np.int32))
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Map the link graph saved in `directory` without reading it.
+
+        Returns None if there is no saved graph, or if the HTML pages
+        have changed since it was saved.
+        """
+        path = os.path.join(directory, GRAPH_NAME)
+        try:
+            with open(os.path.join(path, "header.json")) as f:
+                header = json.load(f)
+            if header["version"] != GRAPH_VERSION or \
+                    header["sources"] != source_signature(directory):
+                return None
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"),
+                              mmap_mode="r")
+                for name in GRAPH_ARRAYS
+            }
+        except (OSError, ValueError, KeyError):
+            return None
+        pages = PageTable(arrays["names"], arrays["name_offsets"])
+        return cls(pages, arrays["offsets"], arrays["links"])
+
+    def save(self, directory):
+        """
+        Write the link graph to `directory`, recording the HTML pages it
+        was built from.
+        """
+        path = os.path.join(directory, GRAPH_NAME)
+        os.makedirs(path, exist_ok=True)
+        header = os.path.join(path, "header.json")
+        if os.path.exists(header):
+            os.remove(header)
+
+        pages = self.pages
+        if not isinstance(pages, PageTable):
+            pages = PageTable.from_names(pages)
+        arrays = {
+            "names": pages.names,
+            "name_offsets": pages.offsets,
+            "offsets": self.offsets,
+            "links": self.links
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+        # Written last, so a graph is only loaded once it is complete
+        with open(header, "w") as f:
+            json.dump({
+                "version": GRAPH_VERSION,
+                "sources": source_signature(directory)
+            }, f)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def corpus(self):
+        """
+        Return the graph as a `crawl` corpus dictionary.
+        """
+        pages = list(self.pages)
+        offsets = self.offsets.tolist()
+        links = self.links.tolist()
+        return {
+            page: set(pages[link] for link in links[offsets[i]:offsets[i + 1]])
+            for i, page in enumerate(pages)
+        }
+
+    def identity(self):
+        """
+        Return the number of pages and a digest of the page names and
+        link offsets, which tell apart graphs whose pages or numbering
+        differ.
+        """
+        pages = self.pages
+        if not isinstance(pages, PageTable):
+            pages = PageTable.from_names(pages)
+        digest = hashlib.sha1()
+        for array in (pages.names, pages.offsets, self.offsets):
+            digest.update(np.ascontiguousarray(array))
+        return {"pages": len(self), "digest": digest.hexdigest()}
+
+    def index(self, page):
+        """
+        Return the number of `page`, found by binary search of the
+        sorted page names.
+        """
+        i = bisect_left(self.pages, page)
+        if i == len(self) or self.pages[i] != page:
+            raise ValueError(f"{page} is not in the corpus")
+        return i
+
+    def outdegree(self):
+        """
+        Return the number of links out of each page.
+        """
+        return np.diff(self.offsets)
+
+    def dangling(self):
+        """
+        Return a boolean mask of the pages that have no links.
+        """
+        return self.outdegree() == 0
+
+    def sources(self):
+        """
+        Return the page each entry of `links` comes from.
+        """
+        return np.repeat(np.arange(len(self), dtype=np.int32), self.outdegree())
+
+    def transition_matrix(self):
+        """
+        Return the sparse matrix M with M[j, i] = 1 / outdegree(i) for
+        every link from page i to page j.
+
+        Columns of linking pages sum to 1; columns of dangling pages are
+        left empty, and their rank is redistributed separately.
+        """
+        # The outlinks in CSR form are the columns of M in CSC form
+        weights = np.repeat(1 / np.maximum(self.outdegree(), 1),
+                            self.outdegree())
+        return sparse.csc_matrix(
+            (weights, self.links, self.offsets), shape=(len(self), len(self))
+        )
+
+    def ranks(self, vector):
+        """
+        Return a `{page: rank}` dictionary from a vector of ranks.
+        """
+        return dict(zip(self.pages, vector.tolist()))
+
+
+def page_files(directory):
+    """
+    Return a dictionary mapping each HTML page in `directory` to its
+    size and modification time, which change whenever the page does.
+    """
+    files = {}
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".html"):
+            stat = entry.stat()
+            files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def source_signature(directory):
+    """
+    Return the number of HTML pages in `directory` and a digest of the
+    name, size and modification time of each, which change whenever a
+    page is added, removed, renamed or edited.
+    """
+    files = page_files(directory)
+    digest = hashlib.sha1()
+    for name in sorted(files):
+        size, mtime = files[name]
+        digest.update(f"{name}\0{size}\0{mtime}\n".encode("utf-8"))
+    return {"pages": len(files), "digest": digest.hexdigest()}
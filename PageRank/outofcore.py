@@ -0,0 +1,216 @@
+import json
+import os
+
+import numpy as np
+
+from linkgraph import GRAPH_NAME, source_signature
+
+# Edge blocks written next to the saved link graph
+BLOCKS_NAME = "blocks"
+BLOCKS_VERSION = 1
+
+# Default memory budget for out-of-core iteration, in bytes
+MEMORY_BUDGET = 256 << 20
+
+# Bytes of memory per page held while iterating: the ranks, the new
+# ranks, each page's share of rank per link, one over its number of
+# links, the number itself and whether it is zero
+BYTES_PER_PAGE = 4 * 8 + 4 + 1
+
+# Bytes of memory per edge of the block being streamed: the (source,
+# destination) pair, plus the destinations within the block, the
+# sources as indices and the rank gathered from them as 64-bit arrays
+BYTES_PER_EDGE = 2 * 4 + 3 * 8
+
+# Building blocks sorts each piece of links read, which takes about
+# this many times the memory per edge of iterating
+BUILD_OVERHEAD = 4
+
+
+class BlockGraph():
+
+    def __init__(self, path, bounds, outdegree):
+        """
+        Create an out-of-core graph from the directory `path` holding
+        one edge file per block, where block `b` holds every link into
+        pages bounds[b] up to bounds[b + 1] as (source, destination)
+        pairs, and the number of links out of each page.
+        """
+        self.path = path
+        self.bounds = bounds
+        self.outdegree = outdegree
+
+    @classmethod
+    def build(cls, graph, directory, memory=MEMORY_BUDGET):
+        """
+        Partition the links of `graph` by destination into blocks small
+        enough to stream within `memory` bytes, and write them to the
+        saved link graph in `directory`, recording which graph they
+        were cut from.
+
+        The links are read in pieces of the same size, so `graph` may be
+        a memory-mapped LinkGraph larger than `memory`.
+        """
+        N = len(graph)
+        edges = block_edges(N, memory)
+        piece = max(1, edges // BUILD_OVERHEAD)
+        path = os.path.join(directory, GRAPH_NAME, BLOCKS_NAME)
+        os.makedirs(path, exist_ok=True)
+        header = os.path.join(path, "header.json")
+        for filename in os.listdir(path):
+            if filename == "header.json" or filename.endswith(".edges"):
+                os.remove(os.path.join(path, filename))
+
+        # Cut blocks where the links into pages so far pass each multiple
+        # of `edges`; a page with more links than that gets its own block
+        indegree = np.zeros(N, dtype=np.int64)
+        for start in range(0, len(graph.links), piece):
+            indegree += np.bincount(graph.links[start:start + piece],
+                                    minlength=N)
+        cumulative = np.cumsum(indegree)
+        bounds = [0]
+        while bounds[-1] < N:
+            done = cumulative[bounds[-1] - 1] if bounds[-1] else 0
+            end = int(np.searchsorted(cumulative, done + edges, "right"))
+            bounds.append(min(N, max(end, bounds[-1] + 1)))
+        bounds = np.array(bounds, dtype=np.int64)
+        del indegree, cumulative
+
+        files = [open(block_path(path, b), "wb")
+                 for b in range(len(bounds) - 1)]
+        try:
+            # Walk the links in pieces of whole source pages
+            offsets = graph.offsets
+            source = 0
+            while source < N:
+                end = int(np.searchsorted(
+                    offsets, offsets[source] + piece, "right")) - 1
+                end = min(N, max(end, source + 1))
+                links = np.asarray(graph.links[offsets[source]:offsets[end]])
+                sources = np.repeat(
+                    np.arange(source, end, dtype=np.int32),
+                    np.diff(offsets[source:end + 1]))
+                blocks = np.searchsorted(bounds, links, "right") - 1
+                order = np.argsort(blocks, kind="stable")
+                pairs = np.column_stack((sources, links))[order]
+                cuts = np.searchsorted(blocks[order],
+                                       np.arange(len(files) + 1))
+                for b, f in enumerate(files):
+                    pairs[cuts[b]:cuts[b + 1]].astype(np.int32).tofile(f)
+                source = end
+        finally:
+            for f in files:
+                f.close()
+
+        outdegree = np.diff(graph.offsets).astype(np.int32)
+        np.save(os.path.join(path, "outdegree.npy"), outdegree)
+        with open(header, "w") as f:
+            json.dump({
+                "version": BLOCKS_VERSION,
+                "memory": memory,
+                "sources": source_signature(directory),
+                "graph": graph.identity(),
+                "bounds": bounds.tolist()
+            }, f)
+        return cls(path, bounds, outdegree)
+
+    @classmethod
+    def load(cls, directory, graph, memory=MEMORY_BUDGET):
+        """
+        Return the blocks of `graph` saved with the link graph in
+        `directory`, or None if there are none, they were cut for
+        another budget or from another graph, or the HTML pages have
+        changed since.
+        """
+        path = os.path.join(directory, GRAPH_NAME, BLOCKS_NAME)
+        try:
+            with open(os.path.join(path, "header.json")) as f:
+                header = json.load(f)
+            if header["version"] != BLOCKS_VERSION or \
+                    header["memory"] != memory or \
+                    header["sources"] != source_signature(directory) or \
+                    header["graph"] != graph.identity():
+                return None
+            outdegree = np.load(os.path.join(path, "outdegree.npy"),
+                                mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(path, np.array(header["bounds"]), outdegree)
+
+    def __len__(self):
+        return len(self.outdegree)
+
+    def blocks(self):
+        """
+        Yield the first page, last page and (source, destination) pairs
+        of each block, reading one block at a time.
+        """
+        for b in range(len(self.bounds) - 1):
+            pairs = np.fromfile(block_path(self.path, b), dtype=np.int32)
+            yield self.bounds[b], self.bounds[b + 1], pairs.reshape(-1, 2)
+
+
+def block_pagerank(blocks, damping_factor, tolerance, max_iterations,
+                   report=None):
+    """
+    Return the vector of PageRank values for each page of `blocks`, a
+    BlockGraph, by power iteration that streams the edge blocks from
+    disk on every sweep.
+
+    Only the rank vectors and one block of edges are held in memory.
+    Iteration stops once the L1 norm of the change in ranks falls below
+    `tolerance`, or after `max_iterations` sweeps. If `report` is a
+    dictionary, the number of sweeps is stored in it.
+    """
+    N = len(blocks)
+    dangling = np.asarray(blocks.outdegree) == 0
+    inverse = np.zeros(N)
+    np.divide(1, blocks.outdegree, out=inverse, where=~dangling)
+    ranks = np.full(N, 1 / N)
+    new_ranks = np.empty(N)
+    share = np.empty(N)
+
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        # Rank each page passes along each of its links
+        np.multiply(ranks, inverse, out=share)
+        for start, end, pairs in blocks.blocks():
+            new_ranks[start:end] = np.bincount(
+                pairs[:, 1] - start, weights=share[pairs[:, 0]],
+                minlength=end - start)
+
+        # Pages with no links spread their rank over every page
+        new_ranks += ranks.sum(where=dangling) / N
+        new_ranks *= damping_factor
+        new_ranks += (1 - damping_factor) / N
+
+        # The old ranks are not needed again, so they are reused for
+        # the next sweep's ranks
+        ranks -= new_ranks
+        change = np.abs(ranks, out=ranks).sum()
+        ranks, new_ranks = new_ranks, ranks
+        if change < tolerance:
+            break
+    if report is not None:
+        report["iterations"] = iterations
+    return ranks
+
+
+def block_edges(pages, memory):
+    """
+    Return how many edges fit in a block alongside the rank vectors of
+    `pages` pages within `memory` bytes.
+    """
+    edges = (memory - BYTES_PER_PAGE * pages) // BYTES_PER_EDGE
+    if edges < 1:
+        raise Exception(f"{memory} bytes is too little memory for the "
+                        f"rank vectors of {pages} pages")
+    return edges
+
+
+def block_path(path, block):
+    """
+    Return the path of the edge file of `block` in `path`.
+    """
+    return os.path.join(path, f"{block}.edges")
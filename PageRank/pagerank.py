@@ -1,53 +1,239 @@
+import argparse
 import os
 import random
 import re
 import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from linkgraph import LinkGraph
+from outofcore import MEMORY_BUDGET, BlockGraph, block_pagerank
+from solvers import SOLVERS
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Random surfers walking in lockstep in batched_sample_pagerank, and the
+# steps each takes from its random start before its pages are counted
+SURFERS = 1000
+BURN_IN = 50
+
+# Links are <a> tags with a double-quoted href, and nothing after the
+# closing </html> tag is read
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+END_OF_PAGE = "</html>"
+
+# Characters read from a page at a time, and the tail of each block kept
+# for the next one so links split across blocks are still found
+READ_BLOCK = 1 << 16
+READ_OVERLAP = 4096
+
+# Pages handed to a crawl worker at a time
+CRAWL_CHUNK = 256
+
+# Convergence of matrix_pagerank: L1 change between sweeps, and a cap
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser(description="PageRank")
+    parser.add_argument("corpus")
+    parser.add_argument("--engine", choices=["matrix", "blocks", "iterate"],
+                        default="matrix",
+                        help="sparse power iteration, the same streaming "
+                             "the links from disk, or the per-page updates")
+    parser.add_argument("--solver", choices=SOLVERS, default="jacobi",
+                        help="how the matrix engine iterates")
+    parser.add_argument("--memory", type=int, default=MEMORY_BUDGET >> 20,
+                        help="megabytes the blocks engine may use")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="L1 change at which the matrix engine stops")
+    parser.add_argument("--max-iterations", type=int, default=MAX_ITERATIONS)
+    parser.add_argument("--sampler", choices=["batched", "sequential"],
+                        default="batched",
+                        help="many surfers at once or the one-surfer chain")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--seed", type=int,
+                        help="seed for the batched sampler")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="processes used to crawl the corpus")
+    parser.add_argument("--stats", action="store_true",
+                        help="report how fast the corpus was crawled")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="crawl the corpus even if a saved graph is fresh")
+    parser.add_argument("--personalize", nargs="+", metavar="PAGE",
+                        help="also rank pages for a surfer who only jumps "
+                             "to these pages")
+    args = parser.parse_args()
+
+    graph = None if args.no_cache else LinkGraph.load(args.corpus)
+    crawled = graph is None
+    if crawled:
+        report = {}
+        graph = LinkGraph.from_corpus(
+            crawl(args.corpus, args.processes, report))
+        try:
+            graph.save(args.corpus)
+        except OSError:
+            # A read-only corpus is still usable, just not cached
+            pass
+        if args.stats:
+            rate = report["pages"] / max(report["seconds"], 1e-9)
+            print(f"Crawled {report['pages']} pages in "
+                  f"{report['seconds']:.2f}s ({rate:.0f} pages/sec)")
+    elif args.stats:
+        print(f"Loaded {len(graph)} pages from the saved link graph")
+
+    # Check the pages to personalize for before spending time ranking
+    for page in args.personalize or []:
+        try:
+            graph.index(page)
+        except ValueError:
+            sys.exit(f"Cannot personalize for {page}, it is not in the corpus")
+
+    # The original engines work on the corpus dictionary
+    corpus = None
+    if args.sampler == "sequential" or args.engine == "iterate":
+        corpus = graph.corpus()
+
+    if args.sampler == "batched":
+        ranks = batched_sample_pagerank(graph, DAMPING, args.samples,
+                                        seed=args.seed)
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, args.samples)
+    print(f"PageRank Results from Sampling (n = {args.samples})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    if args.engine == "matrix":
+        report = {}
+        ranks = matrix_pagerank(graph, DAMPING, args.tolerance,
+                                args.max_iterations, solver=args.solver,
+                                report=report)
+        if args.stats:
+            print(f"{args.solver} converged in {report['iterations']} "
+                  f"iterations, residual {report['residuals'][-1]:.2e}")
+    elif args.engine == "blocks":
+        memory = args.memory << 20
+        # Blocks saved before a crawl may number the pages differently
+        blocks = None if crawled else \
+            BlockGraph.load(args.corpus, graph, memory)
+        if blocks is None:
+            try:
+                blocks = BlockGraph.build(graph, args.corpus, memory)
+            except OSError as error:
+                sys.exit(f"Cannot write the blocks to {args.corpus}: {error}")
+        ranks = graph.ranks(block_pagerank(
+            blocks, DAMPING, args.tolerance, args.max_iterations))
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    if args.personalize:
+        ranks = personalized_pagerank(graph, DAMPING, args.personalize,
+                                      args.tolerance, args.max_iterations)
+        print(f"Personalized PageRank Results ({', '.join(args.personalize)})")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, processes=1, report=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    Pages are parsed by a pool of `processes` workers, CRAWL_CHUNK pages
+    at a time. If `report` is a dictionary, the number of pages and the
+    seconds taken are stored in it.
     """
-    pages = dict()
+    start = time.perf_counter()
+    filenames = [
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    ]
+    pages = corpus_links(parse_pages(directory, filenames, processes))
+    if report is not None:
+        report["pages"] = len(pages)
+        report["seconds"] = time.perf_counter() - start
+    return pages
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
 
+def parse_pages(directory, filenames, processes=1):
+    """
+    Return a dictionary mapping each of `filenames` in `directory` to
+    the set of every other page it links to, in the corpus or not.
+    """
+    chunks = [
+        (directory, filenames[i:i + CRAWL_CHUNK])
+        for i in range(0, len(filenames), CRAWL_CHUNK)
+    ]
+
+    # Extract all links from HTML files
+    pages = dict()
+    if processes == 1 or len(chunks) <= 1:
+        for chunk in map(crawl_chunk, chunks):
+            pages.update(chunk)
+    else:
+        with Pool(processes) as pool:
+            for chunk in pool.imap_unordered(crawl_chunk, chunks):
+                pages.update(chunk)
     return pages
 
 
+def corpus_links(pages):
+    """
+    Return a copy of `pages` keeping only links to other pages in it.
+    """
+    return {
+        filename: set(link for link in links if link in pages)
+        for filename, links in pages.items()
+    }
+
+
+def crawl_chunk(job):
+    """
+    Return the links out of each page in a `(directory, filenames)`
+    chunk, as a list of `(filename, links)` pairs.
+    """
+    directory, filenames = job
+    return [
+        (filename, page_links(os.path.join(directory, filename)) - {filename})
+        for filename in filenames
+    ]
+
+
+def page_links(path):
+    """
+    Return the set of links in the HTML page at `path`.
+
+    The page is read in blocks and reading stops at `</html>`, so large
+    pages are never held in memory whole. A link tag split across two
+    blocks is found as long as it is shorter than READ_OVERLAP.
+    """
+    links = set()
+    with open(path) as f:
+        buffer = ""
+        while True:
+            block = f.read(READ_BLOCK)
+            searched = max(0, len(buffer) - len(END_OF_PAGE) + 1)
+            buffer += block
+            end = buffer.find(END_OF_PAGE, searched)
+            if end != -1 or not block:
+                if end != -1:
+                    buffer = buffer[:end]
+                links.update(LINK.findall(buffer))
+                return links
+            last = 0
+            for match in LINK.finditer(buffer):
+                links.add(match.group(1))
+                last = match.end()
+            buffer = buffer[max(last, len(buffer) - READ_OVERLAP):]
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page the random 
@@ -94,31 +280,68 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    pagerank = {}
+    pages = list(corpus)
+    links = {page: list(corpus[page]) for page in corpus}
+    pagerank = {page: 0 for page in corpus}
 
+    # Pick any random page at start
+    page = random.choice(pages)
     for i in range(n):
-        if not i:
-            # Pick any random page at start
-            page = random.choices(list(corpus.keys()))[0]
-        else:
-            """Calculate transition model probability of the current page
-            Meaning - calculate probability with which random surfer will
-            click on the link """
-            trans_prob = transition_model(corpus, page, damping_factor)
-            # Pick any one according to weight
-            page = random.choices(list(trans_prob.keys()),
-                                  weights=list(trans_prob.values()))[0]
+        if i:
+            # Follow a link with probability `damping_factor`; otherwise,
+            # or if the page has no links, jump to any page. This is the
+            # distribution of transition_model without building it
+            if links[page] and random.random() < damping_factor:
+                page = random.choice(links[page])
+            else:
+                page = random.choice(pages)
         # Keep track of no. of times each page visited
-        try:
-            pagerank[page] += 1
-        except KeyError:
-            pagerank[page] = 0
+        pagerank[page] += 1
 
     for key, val in pagerank.items():
         pagerank[key] /= n
     return pagerank
 
 
+def batched_sample_pagerank(corpus, damping_factor, n, surfers=SURFERS,
+                            seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    many random surfers moving in lockstep.
+
+    Each surfer starts at a random page and takes BURN_IN steps before
+    the pages it visits are counted. On each step it follows a random
+    link of its page with probability `damping_factor`, and otherwise,
+    or if its page has no links, jumps to any page in the corpus.
+    `seed` seeds the random number generator. `corpus` may be a
+    LinkGraph instead of a dictionary.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = link_graph(corpus)
+    outdegree = graph.outdegree()
+    N = len(graph)
+    rng = np.random.default_rng(seed)
+
+    surfers = max(1, min(surfers, n))
+    pages = rng.integers(N, size=surfers)
+    visits = np.zeros(N, dtype=np.int64)
+    for step in range(BURN_IN + -(-n // surfers)):
+        degree = outdegree[pages]
+        follow = (rng.random(surfers) < damping_factor) & (degree > 0)
+        choice = (rng.random(surfers) * degree).astype(np.int64)
+        next_pages = rng.integers(N, size=surfers)
+        next_pages[follow] = graph.links[graph.offsets[pages[follow]]
+                                         + choice[follow]]
+        pages = next_pages
+        if step >= BURN_IN:
+            counted = min(surfers, n - (step - BURN_IN) * surfers)
+            visits += np.bincount(pages[:counted], minlength=N)
+    return graph.ranks(visits / n)
+
+
 def iterate_pagerank(corpus, damping_factor):
     """
     Return PageRank values for each page by iteratively updating
@@ -130,22 +353,23 @@ def iterate_pagerank(corpus, damping_factor):
     """
     pagerank = {}
     N = len(corpus)
+    incoming = {key: [] for key in corpus}
     for key in corpus:
         pagerank[key] = 1/N
-        # Consider pages with no links
-        if not corpus[key]:
-            for page in corpus:
-                corpus[key].add(page)
+        for link in corpus[key]:
+            incoming[link].append(key)
+    # Pages with no links are treated as linking to every page, so their
+    # rank is spread evenly without adding those links to the corpus
+    dangling = [key for key in corpus if not corpus[key]]
     flag = 0
     while not flag:
         flag = 1
-        accuracy = 0
+        dangling_rank = sum(pagerank[page] for page in dangling)
         for key in pagerank:
-            incoming_links = 0
+            incoming_links = dangling_rank/N
             # Check for incoming links from other pages
-            for page in corpus:
-                if key in corpus[page]:
-                    incoming_links += (pagerank[page])/len(corpus[page])
+            for page in incoming[key]:
+                incoming_links += (pagerank[page])/len(corpus[page])
             new_pagerank = ((1 - damping_factor)/N) + \
                 (damping_factor * incoming_links)
             # Check accuracy
@@ -155,5 +379,131 @@ def iterate_pagerank(corpus, damping_factor):
     return pagerank
 
 
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, initial=None, report=None,
+                    solver="jacobi"):
+    """
+    Return PageRank values for each page by iterating over a sparse
+    transition matrix built once from the corpus, which may be a
+    LinkGraph instead of a dictionary.
+
+    `solver` names one of SOLVERS: plain power iteration ("jacobi"),
+    Gauss-Seidel sweeps, or power iteration with Aitken or quadratic
+    extrapolation. Iteration stops once the residual, the L1 norm of
+    the change one more step of the surfer would make, falls below
+    `tolerance`, or after `max_iterations` iterations. It starts from
+    the `initial` ranks dictionary if given, such as the ranks of an
+    earlier version of the corpus, with pages missing from it starting
+    at 1/N. If `report` is a dictionary, the number of iterations and
+    the residual of each are stored in it.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = link_graph(corpus)
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling()
+    N = len(graph)
+
+    ranks = np.full(N, 1 / N)
+    if initial:
+        ranks = np.array([initial.get(page, 1 / N) for page in graph.pages])
+        ranks /= ranks.sum()
+    ranks, residuals = SOLVERS[solver](matrix, dangling, damping_factor,
+                                       ranks, tolerance, max_iterations)
+    if report is not None:
+        report["iterations"] = len(residuals)
+        report["residuals"] = residuals
+    return graph.ranks(ranks)
+
+
+def personalized_pagerank(corpus, damping_factor, teleport,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for each page for a random surfer who, with
+    probability `1 - damping_factor` or on a page with no links, jumps
+    to a page chosen by `teleport` instead of any page in the corpus.
+
+    `teleport` is either a dictionary of page weights, which need not
+    sum to 1, or a collection of seed pages to jump to uniformly.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    return batched_personalized_pagerank(
+        corpus, damping_factor, [teleport], tolerance, max_iterations)[0]
+
+
+def batched_personalized_pagerank(corpus, damping_factor, teleports,
+                                  tolerance=TOLERANCE,
+                                  max_iterations=MAX_ITERATIONS,
+                                  report=None):
+    """
+    Return a list of personalized PageRank dictionaries, one for each
+    teleport in `teleports`, as described in `personalized_pagerank`.
+
+    All rankings are iterated together as the columns of one matrix, so
+    each sweep reads the link graph once however many there are.
+    Iteration stops once every column has changed by less than
+    `tolerance` (L1), or after `max_iterations` sweeps. If `report` is a
+    dictionary, the number of sweeps is stored in it.
+    """
+    graph = link_graph(corpus)
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling().astype(float)
+    jumps = np.column_stack([
+        teleport_vector(graph, teleport) for teleport in teleports
+    ])
+
+    ranks = jumps.copy()
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        # Pages with no links send their rank to the teleport pages
+        new_ranks = matrix @ ranks
+        new_ranks *= damping_factor
+        new_ranks += jumps * (
+            damping_factor * (dangling @ ranks) + 1 - damping_factor)
+        # The old ranks are not needed again, so their difference from
+        # the new ones is taken in place
+        ranks -= new_ranks
+        change = np.abs(ranks, out=ranks).sum(axis=0).max()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    if report is not None:
+        report["iterations"] = iterations
+    pages = list(graph.pages)
+    return [dict(zip(pages, column)) for column in ranks.T.tolist()]
+
+
+def teleport_vector(graph, teleport):
+    """
+    Return the probability of jumping to each page of `graph` for a
+    `teleport` dictionary of page weights or collection of seed pages.
+    """
+    if not isinstance(teleport, dict):
+        teleport = {page: 1 for page in teleport}
+    vector = np.zeros(len(graph))
+    for page, weight in teleport.items():
+        if weight < 0:
+            raise Exception(f"negative teleport weight for {page}")
+        vector[graph.index(page)] += weight
+    if not vector.sum():
+        raise Exception("teleport has no weight on any page")
+    return vector / vector.sum()
+
+
+def link_graph(corpus):
+    """
+    Return `corpus` as a LinkGraph, building one if it is a dictionary.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,168 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve_triangular
+
+# Power iterations between extrapolations in the aitken and quadratic
+# solvers, and the iterations before the first one
+EXTRAPOLATE_EVERY = 10
+EXTRAPOLATE_AFTER = 5
+
+
+def google_step(matrix, dangling, damping_factor, ranks):
+    """
+    Return the ranks after one step of the random surfer from `ranks`,
+    where `matrix` holds the links and pages in the `dangling` mask,
+    having none, spread their rank over every page.
+    """
+    N = len(ranks)
+    return (1 - damping_factor) / N + damping_factor * (
+        matrix @ ranks + ranks[dangling].sum() / N)
+
+
+def jacobi(matrix, dangling, damping_factor, ranks, tolerance,
+           max_iterations):
+    """
+    Iterate the random surfer from `ranks` until the residual, the L1
+    norm of the change one step makes, falls below `tolerance`.
+
+    Returns the ranks and the residual of each iteration.
+    """
+    residuals = []
+    while len(residuals) < max_iterations:
+        new_ranks = google_step(matrix, dangling, damping_factor, ranks)
+        residuals.append(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        if residuals[-1] < tolerance:
+            break
+    return ranks, residuals
+
+
+def gauss_seidel(matrix, dangling, damping_factor, ranks, tolerance,
+                 max_iterations):
+    """
+    Solve (I - d M) x = 1 by Gauss-Seidel sweeps, which use the new
+    rank of every page earlier in the order as soon as it is known.
+    Normalizing x gives the ranks, since pages with no links spread
+    their rank as uniformly as the surfer's random jumps do.
+
+    Returns the ranks and the residual of each iteration, as in `jacobi`.
+    """
+    N = len(ranks)
+    system = (sparse.identity(N, format="csr")
+              - damping_factor * sparse.csr_matrix(matrix))
+    lower = sparse.tril(system, format="csr")
+    upper = sparse.triu(system, k=1, format="csr")
+    ones = np.ones(N)
+
+    solution = ranks * N
+    residuals = []
+    while len(residuals) < max_iterations:
+        solution = spsolve_triangular(lower, ones - upper @ solution,
+                                      lower=True)
+        ranks = solution / solution.sum()
+        residuals.append(np.abs(
+            google_step(matrix, dangling, damping_factor, ranks) - ranks
+        ).sum())
+        if residuals[-1] < tolerance:
+            break
+    return ranks, residuals
+
+
+def aitken(matrix, dangling, damping_factor, ranks, tolerance,
+           max_iterations):
+    """
+    Iterate as in `jacobi`, but every EXTRAPOLATE_EVERY iterations
+    estimate the limit of each page's rank from its last three values
+    by Aitken's delta-squared process.
+
+    Returns the ranks and the residual of each iteration.
+    """
+    return extrapolated(matrix, dangling, damping_factor, ranks, tolerance,
+                        max_iterations, 3, aitken_limit)
+
+
+def quadratic(matrix, dangling, damping_factor, ranks, tolerance,
+              max_iterations):
+    """
+    Iterate as in `jacobi`, but every EXTRAPOLATE_EVERY iterations
+    estimate the limit from the last four iterates by quadratic
+    extrapolation, which cancels the two largest error terms together.
+
+    Returns the ranks and the residual of each iteration.
+    """
+    return extrapolated(matrix, dangling, damping_factor, ranks, tolerance,
+                        max_iterations, 4, quadratic_limit)
+
+
+def extrapolated(matrix, dangling, damping_factor, ranks, tolerance,
+                 max_iterations, history, limit):
+    """
+    Iterate as in `jacobi`, replacing the ranks every EXTRAPOLATE_EVERY
+    iterations with `limit` of the last `history` iterates.
+
+    An extrapolation is only kept if the residual of the step after it
+    is smaller than the one before. Otherwise iteration goes back to
+    the last power iterate, and tries again after the next
+    EXTRAPOLATE_EVERY iterations, when the error may be shrinking more
+    the way `limit` assumes.
+    """
+    iterates = [ranks]
+    residuals = []
+    fallback = None
+    while len(residuals) < max_iterations:
+        new_ranks = google_step(matrix, dangling, damping_factor, ranks)
+        residuals.append(np.abs(new_ranks - ranks).sum())
+        if fallback is not None and residuals[-1] >= residuals[-2]:
+            ranks = fallback
+            iterates = [ranks]
+            fallback = None
+            continue
+        fallback = None
+        ranks = new_ranks
+        if residuals[-1] < tolerance:
+            break
+
+        iterates = iterates[-(history - 1):] + [ranks]
+        iteration = len(residuals)
+        if len(iterates) == history and \
+                iteration >= EXTRAPOLATE_AFTER and \
+                (iteration - EXTRAPOLATE_AFTER) % EXTRAPOLATE_EVERY == 0:
+            fallback = ranks
+            ranks = np.maximum(limit(iterates), 0)
+            ranks /= ranks.sum()
+            iterates = [ranks]
+    return ranks, residuals
+
+
+def aitken_limit(iterates):
+    """
+    Return the Aitken delta-squared estimate of the limit of three
+    successive iterates, page by page.
+    """
+    a, b, c = iterates
+    second = c - 2 * b + a
+    first = c - b
+    estimate = c.copy()
+    changing = np.abs(second) > 1e-300
+    estimate[changing] -= first[changing] ** 2 / second[changing]
+    return estimate
+
+
+def quadratic_limit(iterates):
+    """
+    Return the quadratic extrapolation of the limit of four successive
+    iterates, as described by Kamvar et al. (2003).
+    """
+    x0, x1, x2, x3 = iterates
+    y = np.column_stack((x1 - x0, x2 - x0))
+    gamma, *_ = np.linalg.lstsq(y, -(x3 - x0), rcond=None)
+    g1, g2, g3 = gamma[0], gamma[1], 1
+    return (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+
+
+SOLVERS = {
+    "jacobi": jacobi,
+    "gauss-seidel": gauss_seidel,
+    "aitken": aitken,
+    "quadratic": quadratic
+}